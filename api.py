@@ -4,10 +4,13 @@ Handles all asset operations, user management, and transfer logic.
 Run: uvicorn api:app --reload  (from inside /src folder)
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import Depends, FastAPI, HTTPException, UploadFile, File, Form, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import firebase_admin
 from firebase_admin import credentials, auth
@@ -15,9 +18,40 @@ from dotenv import load_dotenv
 from pathlib import Path
 import os
 import json
+import math
+import time
 
-from database import execute_query, execute_one
-from sha256_hash import generate_hash
+import metrics
+import profiler
+import spool
+from database import (
+    DatabaseUnavailable,
+    begin_request_stats,
+    breaker,
+    execute_one,
+    execute_query,
+    execute_read_batch,
+    get_table_versions,
+    transaction,
+)
+from sha256_hash import (
+    MERKLE_CHUNK_SIZE,
+    MerkleHasher,
+    chunk_span,
+    hash_string,
+    merkle_leaves_of_file,
+    merkle_levels,
+    merkle_root,
+    proof_from_levels,
+    new_hasher,
+)
+from blob_store import get_blob_store
+from coalesce import CoalescingMiddleware, joins_flight, sorted_query_key
+from idempotency import IdempotencyMiddleware
+from rate_limit import RateLimitMiddleware
+from stale_cache import StaleCacheMiddleware
+from ledger import append_transfer, verify_asset_chain, verify_ledger
+from registry_tree import append_leaf, inclusion_proof, leaf_hash, registry_root
 
 # Resolve .env from project root
 _env_path = Path(__file__).resolve().parent / ".env"
@@ -52,14 +86,65 @@ app = FastAPI(
     docs_url="/docs",
 )
 
+# Innermost: stores the plain response, so CORS and gzip still apply to replays
+app.add_middleware(IdempotencyMiddleware)
+# Concurrent identical admin reads share one run of the endpoint and its queries
+app.add_middleware(
+    CoalescingMiddleware,
+    routes={
+        "/stats": None,
+        "/admin/overview": sorted_query_key,
+        "/assets/read": sorted_query_key,
+        "/activity/admin/all": sorted_query_key,
+    },
+)
+# While the database is unavailable, GETs answer with their last good response
+app.add_middleware(StaleCacheMiddleware)
+# Per-user / per-IP token buckets and the expensive-route cap; inside CORS so 429s stay readable.
+# Coalesced followers never reach the database, so they take no expensive slot
+app.add_middleware(RateLimitMiddleware, exempt=joins_flight)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "ETag", "Accept-Ranges", "Content-Range", "Server-Timing", "Idempotent-Replayed", "Retry-After",
+        "X-AssetBlock-Stale",
+    ],
 )
 
 
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip API responses, but pass byte downloads through untouched so
+    Content-Length, Range offsets and the content ETag stay exact."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/download"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compress JSON listings (asset registry, activity feed) above ~1 KB
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024)
+# Outermost, so latency includes compression
+app.add_middleware(metrics.MetricsMiddleware, begin_request=begin_request_stats)
+# `kill -USR2 <pid>` profiles this worker for 10 s (see profiler.py)
+profiler.install_signal_handler()
+
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable(request: Request, exc: DatabaseUnavailable):
+    """Fail fast with 503 + Retry-After instead of a 500 the clients would hammer."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database temporarily unavailable, please retry shortly"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
 # ── Pydantic Models ──────────────────────────────────────────────────────────
 class UserCreate(BaseModel):
     uid: str
@@ -80,6 +165,30 @@ class AssetStatusUpdate(BaseModel):
     status: str
 
 
+class AssetFilter(BaseModel):
+    owner_email: Optional[str] = None
+    file_type: Optional[str] = None
+    status: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    q: Optional[str] = None
+
+
+class AssetBatchStatusUpdate(BaseModel):
+    asset_ids: Optional[List[int]] = None
+    filter: Optional[AssetFilter] = None
+    status: str
+
+
+class AssetBatchDelete(BaseModel):
+    asset_ids: Optional[List[int]] = None
+    filter: Optional[AssetFilter] = None
+
+
+class HashLookup(BaseModel):
+    hashes: List[str]
+
+
 class ActivityLog(BaseModel):
     uid: str
     email: str
@@ -96,6 +205,126 @@ def verify_token(token: str) -> dict:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 
+def require_admin(authorization: str = Header("")) -> dict:
+    """Dependency: a Firebase ID token (Authorization: Bearer ...) belonging to an admin user."""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    decoded = verify_token(token)
+    user = execute_one("SELECT uid, email, role FROM users WHERE uid = %s", (decoded["uid"],))
+    if not user or user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+
+# ── Helper: Conditional GET ──────────────────────────────────────────────────
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+ETAG_HITS = metrics.CACHE_LOOKUPS.labels("etag", "hit")
+ETAG_MISSES = metrics.CACHE_LOOKUPS.labels("etag", "miss")
+
+
+def check_not_modified(request: Request, response: Response, *tables: str) -> Optional[Response]:
+    """
+    Tag a read response with an ETag derived from the change counters of the
+    tables it reads. Returns a bare 304 if the client already holds that version,
+    so the caller can skip its row query entirely.
+    """
+    versions = get_table_versions(*tables)
+    marker = ",".join(f"{table}:{version}" for table, version in versions.items())
+    etag = f'W/"{hash_string(f"{request.url.path}?{request.url.query}|{marker}")[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        ETAG_HITS.inc()
+        return Response(status_code=304, headers=headers)
+    ETAG_MISSES.inc()
+    response.headers.update(headers)
+    return None
+
+
+# ── Helper: Paging & Sorting ─────────────────────────────────────────────────
+ASSET_SORT_COLUMNS = {
+    "id": "a.id",
+    "asset_name": "a.asset_name",
+    "file_type": "a.file_type",
+    "file_size": "a.file_size",
+    "status": "a.status",
+    "owner_email": "u.email",
+    "created_at": "a.created_at",
+    "updated_at": "a.updated_at",
+}
+USER_SORT_COLUMNS = {
+    "id": "id",
+    "email": "email",
+    "username": "username",
+    "role": "role",
+    "created_at": "created_at",
+}
+
+
+def order_clause(sort: str, order: str, columns: dict, tiebreak: str) -> str:
+    """Build an ORDER BY from a whitelisted column map (never raw user input)."""
+    if sort not in columns:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {list(columns)}")
+    direction = "ASC" if order.lower() == "asc" else "DESC"
+    return f"ORDER BY {columns[sort]} {direction}, {tiebreak} {direction}"
+
+
+def asset_filters(
+    asset_ids: Optional[List[int]] = None,
+    owner_email: Optional[str] = None,
+    file_type: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+) -> tuple:
+    """WHERE clause and params over `assets a LEFT JOIN users u` for listings and batch ops."""
+    clauses, params = [], []
+    if asset_ids is not None:
+        clauses.append("a.id = ANY(%s)")
+        params.append(list(asset_ids))
+    if owner_email:
+        clauses.append("u.email = %s")
+        params.append(owner_email)
+    if file_type:
+        clauses.append("a.file_type = %s")
+        params.append(file_type)
+    if status:
+        clauses.append("a.status = %s")
+        params.append(status)
+    if created_from:
+        clauses.append("a.created_at >= %s")
+        params.append(created_from)
+    if created_to:
+        clauses.append("a.created_at < %s")
+        params.append(created_to)
+    if q:
+        clauses.append("(a.asset_name ILIKE %s OR a.hash ILIKE %s OR a.description ILIKE %s)")
+        params += [f"%{q}%"] * 3
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def fetch_page(select_sql: str, count_sql: str, params: list, limit: Optional[int], offset: int) -> tuple:
+    """Return (rows, total). Without a limit this is a plain full listing."""
+    if limit is None:
+        rows = execute_query(select_sql, tuple(params), fetch=True)
+        return rows, len(rows)
+    total, rows = execute_read_batch([
+        (count_sql, tuple(params)),
+        (select_sql + " LIMIT %s OFFSET %s", tuple(params) + (limit, offset)),
+    ])
+    return rows, total[0]["count"]
+
+
 # ── ROOT ─────────────────────────────────────────────────────────────────────
 @app.get("/")
 def root():
@@ -103,10 +332,31 @@ def root():
         "app": "AssetBlock",
         "version": "2.0.0",
         "status": "running",
+        "database": breaker.state,
         "message": "🔒 Secure Asset Management System",
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus text exposition of request, hashing, database and cache metrics."""
+    return PlainTextResponse(metrics.render_all(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.post("/admin/profile", tags=["Admin"])
+def start_profile(
+    seconds: float = Query(profiler.DEFAULT_SECONDS, gt=0, le=profiler.MAX_SECONDS),
+    interval_ms: float = Query(profiler.DEFAULT_INTERVAL * 1000, ge=1, le=1000),
+    admin: dict = Depends(require_admin),
+):
+    """Sample this worker's stacks for `seconds` and write collapsed stacks to disk."""
+    session = profiler.start_profile(seconds, interval_ms / 1000)
+    if session is None:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    log_activity(admin["uid"], admin["email"], "PROFILE", f"Started a {seconds:g}s profile -> {session.path}")
+    return {"pid": os.getpid(), "seconds": session.seconds, "interval_ms": interval_ms, "output": str(session.path)}
+
+
 # ── USERS ─────────────────────────────────────────────────────────────────────
 @app.post("/users/register", tags=["Users"])
 def register_user(user: UserCreate):
@@ -142,16 +392,72 @@ def get_user_by_email(email: str):
 
 
 @app.get("/users", tags=["Users"])
-def get_all_users():
-    """Admin: Get all registered users."""
-    users = execute_query(
-        "SELECT id, uid, email, username, role, created_at FROM users ORDER BY created_at DESC",
-        fetch=True,
+def get_all_users(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort: str = "created_at",
+    order: str = "desc",
+):
+    """Admin: Get registered users, optionally one sorted page at a time."""
+    not_modified = check_not_modified(request, response, "users")
+    if not_modified:
+        return not_modified
+    users, total = fetch_page(
+        "SELECT id, uid, email, username, role, created_at FROM users "
+        + order_clause(sort, order, USER_SORT_COLUMNS, "id"),
+        "SELECT COUNT(*) as count FROM users",
+        [],
+        limit,
+        offset,
     )
-    return {"users": users, "total": len(users)}
+    return {"users": users, "total": total}
 
 
 # ── ASSETS ────────────────────────────────────────────────────────────────────
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_HASHED_BYTES = metrics.HASHED_BYTES.labels("upload")
+UPLOAD_HASH_SECONDS = metrics.HASH_SECONDS.labels("upload")
+VERIFY_HASHED_BYTES = metrics.HASHED_BYTES.labels("verify")
+VERIFY_HASH_SECONDS = metrics.HASH_SECONDS.labels("verify")
+
+
+def register_upload(asset_name: str, file_hash: str, file_type: str, file_size: int, description: str,
+                    owner_uid: str, merkle_root_hex: Optional[str], merkle_chunk_size: Optional[int]) -> tuple:
+    """
+    Reject a duplicate, then insert the asset and append it to the registry
+    tree. Blocking (several statements and the registry_state row lock), so
+    upload_asset runs it in the threadpool. Returns (asset row, registry root).
+    """
+    # Check for duplicate hash
+    existing = execute_one("SELECT * FROM assets WHERE hash = %s", (file_hash,))
+    if existing:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Asset already exists. Registered to asset ID #{existing['id']} — '{existing['asset_name']}'",
+        )
+
+    # Insert asset and append it to the registry tree in one transaction
+    with transaction() as cur:
+        cur.execute(
+            """
+            INSERT INTO assets (asset_name, hash, file_type, file_size, description, owner_uid,
+                                merkle_root, merkle_chunk_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id, asset_name, hash, file_type, file_size, description, status, created_at,
+                      merkle_root, merkle_chunk_size
+            """,
+            (asset_name, file_hash, file_type, file_size, description, owner_uid,
+             merkle_root_hex, merkle_chunk_size),
+        )
+        result = dict(cur.fetchone())
+        leaf_index, tree_root = append_leaf(cur, file_hash)
+        cur.execute("UPDATE assets SET mmr_leaf_index = %s WHERE id = %s", (leaf_index, result["id"]))
+        result["mmr_leaf_index"] = leaf_index
+    return result, tree_root
+
+
 @app.post("/assets/upload", tags=["Assets"])
 async def upload_asset(
     file: UploadFile = File(...),
@@ -160,41 +466,121 @@ async def upload_asset(
     description: str = Form(""),
 ):
     """Upload a file asset. Generates SHA-256 hash and rejects duplicates."""
-    content = await file.read()
-    file_hash = generate_hash(content)
-    file_size = len(content)
-    file_type = file.content_type or "unknown"
-    asset_name = file.filename
+    # Hash in chunks (and, with a blob store, persist the same chunks) so the
+    # whole file never sits in memory
+    blob_store = get_blob_store()
+    sink = blob_store.writer() if blob_store else new_hasher()
+    # Chunk leaves only serve /merkle/proof, which needs the stored blob; without
+    # a blob store, skip the second hashing pass (a proof would fingerprint lazily)
+    merkle = MerkleHasher() if blob_store else None
+    file_size = 0
 
-    # Check for duplicate hash
-    existing = execute_one("SELECT * FROM assets WHERE hash = %s", (file_hash,))
-    if existing:
-        raise HTTPException(
-            status_code=409,
-            detail=f"Asset already exists. Registered to asset ID #{existing['id']} — '{existing['asset_name']}'",
+    def consume(chunk):
+        start = time.perf_counter()
+        sink.update(chunk)
+        if merkle is not None:
+            merkle.update(chunk)
+        UPLOAD_HASH_SECONDS.inc(time.perf_counter() - start)
+        UPLOAD_HASHED_BYTES.inc(len(chunk))
+
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            file_size += len(chunk)
+            await run_in_threadpool(consume, chunk)
+        file_hash = sink.hexdigest()
+        leaves = merkle.finish() if merkle is not None else None
+        root, chunk_size = (merkle_root(leaves), merkle.chunk_size) if merkle is not None else (None, None)
+        file_type = file.content_type or "unknown"
+        asset_name = file.filename
+
+        result, tree_root = await run_in_threadpool(
+            register_upload, asset_name, file_hash, file_type, file_size, description, owner_uid, root, chunk_size
         )
 
-    # Insert asset
-    result = execute_one(
-        """
-        INSERT INTO assets (asset_name, hash, file_type, file_size, description, owner_uid)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING id, asset_name, hash, file_type, file_size, description, status, created_at
-        """,
-        (asset_name, file_hash, file_type, file_size, description, owner_uid),
-    )
+        if blob_store:
+            # Published only once the asset row exists, so a rejected duplicate or a
+            # failed insert never leaves an unreferenced blob behind
+            await run_in_threadpool(sink.commit)
+            await run_in_threadpool(blob_store.write_leaves, file_hash, merkle.chunk_size, leaves)
+    finally:
+        if blob_store:
+            sink.abort()
 
-    log_activity(owner_uid, owner_email, "UPLOAD", f"Uploaded '{asset_name}' [hash: {file_hash[:16]}...]")
+    await run_in_threadpool(
+        log_activity, owner_uid, owner_email, "UPLOAD", f"Uploaded '{asset_name}' [hash: {file_hash[:16]}...]"
+    )
     return {
         "message": "Asset uploaded successfully",
         "asset": result,
         "hash": file_hash,
+        "registry_root": tree_root,
+    }
+
+
+MAX_HASH_LOOKUP = 1000
+
+
+@app.post("/assets/exists", tags=["Assets"])
+def assets_exist(payload: HashLookup):
+    """Batch duplicate pre-check: which of these SHA-256 hashes are already registered."""
+    if len(payload.hashes) > MAX_HASH_LOOKUP:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HASH_LOOKUP} hashes per request")
+    hashes = list({h.lower() for h in payload.hashes})
+    rows = execute_query("SELECT id, hash FROM assets WHERE hash = ANY(%s)", (hashes,), fetch=True)
+    return {"existing": {row["hash"]: row["id"] for row in rows}, "checked": len(hashes)}
+
+
+REGISTRATION_QUERY = """
+    SELECT a.id, a.hash, a.asset_name, a.status, a.created_at, a.owner_uid, u.email AS owner_email
+    FROM assets a LEFT JOIN users u ON u.uid = a.owner_uid
+    WHERE a.hash = ANY(%s)
+"""
+
+
+@app.post("/assets/verify", tags=["Assets"])
+async def verify_asset_file(request: Request):
+    """
+    Is this exact file registered? Send the raw bytes as the request body;
+    they are hashed as they stream in and nothing is stored or written.
+    """
+    hasher = new_hasher()
+    size = 0
+
+    def consume(chunk):
+        start = time.perf_counter()
+        hasher.update(chunk)
+        VERIFY_HASH_SECONDS.inc(time.perf_counter() - start)
+        VERIFY_HASHED_BYTES.inc(len(chunk))
+
+    async for chunk in request.stream():
+        size += len(chunk)
+        await run_in_threadpool(consume, chunk)
+    file_hash = hasher.hexdigest()
+    rows = await run_in_threadpool(execute_query, REGISTRATION_QUERY, ([file_hash],), True)
+    return {"hash": file_hash, "size": size, "registered": bool(rows), "asset": rows[0] if rows else None}
+
+
+@app.post("/assets/verify/batch", tags=["Assets"])
+def verify_asset_hashes(payload: HashLookup):
+    """Registration details (owner, status, registered at) for up to MAX_HASH_LOOKUP hashes."""
+    if len(payload.hashes) > MAX_HASH_LOOKUP:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_HASH_LOOKUP} hashes per request")
+    hashes = list({h.lower() for h in payload.hashes})
+    rows = execute_query(REGISTRATION_QUERY, (hashes,), fetch=True)
+    found = {row["hash"]: row for row in rows}
+    return {
+        "registered": found,
+        "unregistered": [h for h in hashes if h not in found],
+        "checked": len(hashes),
     }
 
 
 @app.get("/assets/my/{uid}", tags=["Assets"])
-def get_my_assets(uid: str):
+def get_my_assets(uid: str, request: Request, response: Response):
     """Get all assets owned by a user."""
+    not_modified = check_not_modified(request, response, "assets", "users")
+    if not_modified:
+        return not_modified
     assets = execute_query(
         """
         SELECT a.*, u.email as owner_email, u.username as owner_name
@@ -210,23 +596,54 @@ def get_my_assets(uid: str):
 
 
 @app.get("/assets/read", tags=["Assets"])
-def get_all_assets():
-    """Admin: Get all assets across all users."""
-    assets = execute_query(
-        """
+def get_all_assets(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort: str = "created_at",
+    order: str = "desc",
+    status: Optional[str] = None,
+    q: Optional[str] = None,
+    owner_email: Optional[str] = None,
+    file_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+):
+    """Admin: Get all assets across all users, optionally filtered and paged server-side."""
+    not_modified = check_not_modified(request, response, "assets", "users")
+    if not_modified:
+        return not_modified
+    where, params = asset_filters(
+        owner_email=owner_email,
+        file_type=file_type,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        q=q,
+    )
+    assets, total = fetch_page(
+        f"""
         SELECT a.*, u.email as owner_email, u.username as owner_name
         FROM assets a
         LEFT JOIN users u ON a.owner_uid = u.uid
-        ORDER BY a.created_at DESC
+        {where}
+        {order_clause(sort, order, ASSET_SORT_COLUMNS, "a.id")}
         """,
-        fetch=True,
+        f"SELECT COUNT(*) as count FROM assets a LEFT JOIN users u ON a.owner_uid = u.uid {where}",
+        params,
+        limit,
+        offset,
     )
-    return {"assets": assets, "total": len(assets)}
+    return {"assets": assets, "total": total}
 
 
 @app.get("/assets/search/{query}", tags=["Assets"])
-def search_assets(query: str):
+def search_assets(query: str, request: Request, response: Response):
     """Search assets by name, hash, or description."""
+    not_modified = check_not_modified(request, response, "assets", "users")
+    if not_modified:
+        return not_modified
     assets = execute_query(
         """
         SELECT a.*, u.email as owner_email, u.username as owner_name
@@ -242,8 +659,11 @@ def search_assets(query: str):
 
 
 @app.get("/assets/{asset_id}", tags=["Assets"])
-def get_asset(asset_id: int):
+def get_asset(asset_id: int, request: Request, response: Response):
     """Get a single asset by ID."""
+    not_modified = check_not_modified(request, response, "assets", "users")
+    if not_modified:
+        return not_modified
     asset = execute_one(
         """
         SELECT a.*, u.email as owner_email, u.username as owner_name
@@ -258,12 +678,159 @@ def get_asset(asset_id: int):
     return asset
 
 
+VALID_STATUSES = ["Active", "Pending", "Suspended"]
+
+
+def parse_range(range_header: str, size: int) -> Optional[tuple]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end). Returns None to
+    serve the whole file (absent, malformed or multi-range headers) and raises
+    416 when the range lies entirely past the end of the file.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+@app.get("/assets/{asset_id}/download", tags=["Assets"])
+def download_asset(asset_id: int, request: Request):
+    """Download stored asset bytes. Supports Range/If-Range; the strong ETag is the SHA-256."""
+    asset = execute_one("SELECT asset_name, hash, file_type FROM assets WHERE id = %s", (asset_id,))
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    blob_store = get_blob_store()
+    if not blob_store or not blob_store.exists(asset["hash"]):
+        raise HTTPException(status_code=404, detail="Asset bytes are not stored on this server")
+
+    path = blob_store.path_for(asset["hash"])
+    size = path.stat().st_size
+    etag = f'"{asset["hash"]}"'
+    media_type = asset["file_type"] if asset["file_type"] and asset["file_type"] != "unknown" else "application/octet-stream"
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    # If-Range only honours our strong ETag; a date or stale tag gets the full body
+    byte_range = None
+    if request.headers.get("range") and request.headers.get("if-range", etag) == etag:
+        byte_range = parse_range(request.headers["range"], size)
+
+    if byte_range is None:
+        # FileResponse streams in fixed chunks, or hands the path to the server
+        # for zero-copy send where the ASGI server supports it
+        return FileResponse(path, media_type=media_type, filename=asset["asset_name"], headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blob_store.iter_range(asset["hash"], start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@app.get("/assets/{asset_id}/merkle/proof", tags=["Assets"])
+def get_merkle_proof(asset_id: int, start: int = Query(0, ge=0), end: Optional[int] = Query(None, ge=0)):
+    """
+    Prove that bytes start..end belong to an asset: returns the Merkle root and,
+    for every chunk covering the range, its leaf hash and sibling path.
+    """
+    asset = execute_one(
+        "SELECT id, hash, file_size, merkle_root, merkle_chunk_size FROM assets WHERE id = %s",
+        (asset_id,),
+    )
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    blob_store = get_blob_store()
+    if not blob_store or not blob_store.exists(asset["hash"]):
+        raise HTTPException(status_code=404, detail="Asset bytes are not stored on this server")
+    recorded = blob_store.read_leaves(asset["hash"])
+    if recorded is None:
+        # Legacy asset: fingerprint the stored blob in parallel once and keep the result
+        chunk_size = asset["merkle_chunk_size"] or MERKLE_CHUNK_SIZE
+        leaves = merkle_leaves_of_file(blob_store.path_for(asset["hash"]), chunk_size)
+        blob_store.write_leaves(asset["hash"], chunk_size, leaves)
+        recorded = {"chunk_size": chunk_size, "leaves": leaves}
+        if not asset["merkle_root"]:
+            execute_query(
+                "UPDATE assets SET merkle_root = %s, merkle_chunk_size = %s WHERE id = %s",
+                (merkle_root(leaves), chunk_size, asset_id),
+            )
+
+    leaves, chunk_size = recorded["leaves"], recorded["chunk_size"]
+    last_byte = max(asset["file_size"] - 1, 0)
+    end = last_byte if end is None else min(end, last_byte)
+    if start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable")
+    # Hash the tree once; each chunk's sibling path is then just lookups
+    levels = merkle_levels(leaves)
+    return {
+        "asset_id": asset_id,
+        "hash": asset["hash"],
+        "merkle_root": levels[-1][0],
+        "chunk_size": chunk_size,
+        "chunks": [
+            {
+                "index": index,
+                "offset": index * chunk_size,
+                "leaf": leaves[index],
+                "proof": proof_from_levels(levels, index),
+            }
+            for index in chunk_span(start, end, chunk_size)
+        ],
+    }
+
+
+@app.get("/assets/{asset_id}/proof", tags=["Registry"])
+def get_registry_proof(asset_id: int):
+    """
+    Prove an asset's hash is in the registry: the leaf, its sibling path and
+    the registry root it folds up to (sha256_hash.verify_merkle_proof).
+    """
+    asset = execute_one("SELECT id, hash, mmr_leaf_index FROM assets WHERE id = %s", (asset_id,))
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    if asset["mmr_leaf_index"] is None:
+        raise HTTPException(status_code=409, detail="Asset is not in the registry tree yet; run registry_tree.py --backfill")
+    # Nodes are immutable once written, so a proof against this snapshot stays valid
+    state = registry_root()
+    return {
+        "asset_id": asset_id,
+        "hash": asset["hash"],
+        "leaf_index": asset["mmr_leaf_index"],
+        "leaf": leaf_hash(asset["hash"]),
+        "leaf_count": state["leaf_count"],
+        "root": state["root"],
+        "proof": inclusion_proof(asset["mmr_leaf_index"], state["leaf_count"]),
+    }
+
+
 @app.put("/assets/status", tags=["Assets"])
 def update_asset_status(payload: AssetStatusUpdate):
     """Admin: Update asset status (Active/Pending/Suspended)."""
-    valid_statuses = ["Active", "Pending", "Suspended"]
-    if payload.status not in valid_statuses:
-        raise HTTPException(status_code=400, detail=f"Status must be one of {valid_statuses}")
+    if payload.status not in VALID_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {VALID_STATUSES}")
     execute_query(
         "UPDATE assets SET status = %s, updated_at = %s WHERE id = %s",
         (payload.status, datetime.now(), payload.asset_id),
@@ -281,49 +848,100 @@ def delete_asset(asset_id: int, admin_uid: str):
     return {"message": "Asset deleted successfully"}
 
 
+def batch_selection(asset_ids: Optional[List[int]], asset_filter: Optional[AssetFilter]) -> tuple:
+    """Subquery selecting the asset ids targeted by a batch request."""
+    criteria = asset_filter.model_dump(exclude_none=True) if asset_filter else {}
+    if asset_ids is None and not criteria:
+        raise HTTPException(status_code=400, detail="Provide asset_ids or at least one filter field")
+    where, params = asset_filters(asset_ids=asset_ids, **criteria)
+    return f"SELECT a.id FROM assets a LEFT JOIN users u ON a.owner_uid = u.uid {where}", params
+
+
+@app.put("/assets/status/batch", tags=["Assets"])
+def update_asset_status_batch(payload: AssetBatchStatusUpdate, admin: dict = Depends(require_admin)):
+    """Admin: Set the status of many assets (by ID list or filter) in one statement."""
+    if payload.status not in VALID_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {VALID_STATUSES}")
+    selection, params = batch_selection(payload.asset_ids, payload.filter)
+    updated = execute_query(
+        f"UPDATE assets SET status = %s, updated_at = %s WHERE id IN ({selection}) RETURNING id",
+        (payload.status, datetime.now(), *params),
+        fetch=True,
+    )
+    log_activity(admin["uid"], admin["email"], "STATUS", f"Set {len(updated)} asset(s) to '{payload.status}'")
+    return {
+        "message": f"{len(updated)} asset(s) updated to '{payload.status}'",
+        "asset_ids": [row["id"] for row in updated],
+        "total": len(updated),
+    }
+
+
+@app.post("/assets/delete/batch", tags=["Assets"])
+def delete_asset_batch(payload: AssetBatchDelete, admin: dict = Depends(require_admin)):
+    """Admin: Delete many assets (by ID list or filter) in one statement."""
+    selection, params = batch_selection(payload.asset_ids, payload.filter)
+    deleted = execute_query(
+        f"DELETE FROM assets WHERE id IN ({selection}) RETURNING id",
+        tuple(params),
+        fetch=True,
+    )
+    log_activity(admin["uid"], admin["email"], "DELETE", f"Deleted {len(deleted)} asset(s)")
+    return {
+        "message": f"{len(deleted)} asset(s) deleted",
+        "asset_ids": [row["id"] for row in deleted],
+        "total": len(deleted),
+    }
+
+
+# ── REGISTRY ──────────────────────────────────────────────────────────────────
+@app.get("/registry/root", tags=["Registry"])
+def get_registry_root(request: Request, response: Response):
+    """Current Merkle root over every registered asset hash."""
+    not_modified = check_not_modified(request, response, "assets")
+    if not_modified:
+        return not_modified
+    return registry_root()
+
+
 # ── TRANSFER ──────────────────────────────────────────────────────────────────
 @app.post("/assets/transfer", tags=["Transfer"])
 def transfer_asset(payload: TransferRequest):
     """Transfer asset ownership to another user by email."""
-    # Check asset exists and belongs to sender
-    asset = execute_one("SELECT * FROM assets WHERE id = %s", (payload.asset_id,))
-    if not asset:
-        raise HTTPException(status_code=404, detail="Asset not found")
-    if asset["owner_uid"] != payload.from_uid:
-        raise HTTPException(status_code=403, detail="You don't own this asset")
+    # Owner change and ledger entry commit together; FOR UPDATE serialises racing transfers
+    with transaction() as cur:
+        cur.execute("SELECT * FROM assets WHERE id = %s FOR UPDATE", (payload.asset_id,))
+        asset = cur.fetchone()
+        if not asset:
+            raise HTTPException(status_code=404, detail="Asset not found")
+        if asset["owner_uid"] != payload.from_uid:
+            raise HTTPException(status_code=403, detail="You don't own this asset")
 
-    # Find recipient
-    recipient = execute_one("SELECT * FROM users WHERE email = %s", (payload.to_email,))
-    if not recipient:
-        raise HTTPException(status_code=404, detail="Recipient user not found. They must be registered on AssetBlock.")
+        # Find recipient
+        cur.execute("SELECT * FROM users WHERE email = %s", (payload.to_email,))
+        recipient = cur.fetchone()
+        if not recipient:
+            raise HTTPException(status_code=404, detail="Recipient user not found. They must be registered on AssetBlock.")
 
-    if recipient["uid"] == payload.from_uid:
-        raise HTTPException(status_code=400, detail="Cannot transfer asset to yourself")
+        if recipient["uid"] == payload.from_uid:
+            raise HTTPException(status_code=400, detail="Cannot transfer asset to yourself")
 
-    # Get sender info
-    sender = execute_one("SELECT * FROM users WHERE uid = %s", (payload.from_uid,))
+        # Get sender info
+        cur.execute("SELECT * FROM users WHERE uid = %s", (payload.from_uid,))
+        sender = cur.fetchone()
 
-    # Update asset owner
-    execute_query(
-        "UPDATE assets SET owner_uid = %s, updated_at = %s WHERE id = %s",
-        (recipient["uid"], datetime.now(), payload.asset_id),
-    )
-
-    # Log transfer history
-    execute_query(
-        """
-        INSERT INTO transfer_history (asset_id, from_uid, to_uid, from_email, to_email, note)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """,
-        (
+        cur.execute(
+            "UPDATE assets SET owner_uid = %s, updated_at = %s WHERE id = %s",
+            (recipient["uid"], datetime.now(), payload.asset_id),
+        )
+        entry = append_transfer(
+            cur,
             payload.asset_id,
             payload.from_uid,
             recipient["uid"],
             sender["email"] if sender else "",
             payload.to_email,
             payload.note,
-        ),
-    )
+        )
 
     log_activity(
         payload.from_uid,
@@ -335,12 +953,16 @@ def transfer_asset(payload: TransferRequest):
         "message": f"Asset successfully transferred to {payload.to_email}",
         "asset_id": payload.asset_id,
         "new_owner": payload.to_email,
+        "entry_hash": entry["entry_hash"],
     }
 
 
 @app.get("/transfer/history/{asset_id}", tags=["Transfer"])
-def get_transfer_history(asset_id: int):
+def get_transfer_history(asset_id: int, request: Request, response: Response):
     """Get complete transfer history for an asset."""
+    not_modified = check_not_modified(request, response, "transfer_history")
+    if not_modified:
+        return not_modified
     history = execute_query(
         "SELECT * FROM transfer_history WHERE asset_id = %s ORDER BY transferred_at DESC",
         (asset_id,),
@@ -349,20 +971,54 @@ def get_transfer_history(asset_id: int):
     return {"history": history, "total": len(history)}
 
 
+@app.get("/transfer/history/{asset_id}/verify", tags=["Transfer"])
+def verify_transfer_history(asset_id: int):
+    """Re-hash one asset's transfer chain."""
+    return verify_asset_chain(asset_id)
+
+
+@app.post("/ledger/verify", tags=["Transfer"])
+def verify_transfer_ledger(full: bool = False):
+    """Verify the global transfer ledger from the last checkpoint (or from genesis with full=true)."""
+    result = verify_ledger(full=full)
+    if not result["ok"]:
+        log_activity("system", "", "LEDGER_TAMPER", json.dumps(result))
+    return result
+
+
 # ── ACTIVITY LOG ──────────────────────────────────────────────────────────────
+def _insert_activity(records: list):
+    with transaction() as cur:
+        cur.executemany(
+            "INSERT INTO activity_log (uid, email, action, details, created_at) "
+            "VALUES (%(uid)s, %(email)s, %(action)s, %(details)s, COALESCE(%(created_at)s, CURRENT_TIMESTAMP))",
+            records,
+        )
+
+
 def log_activity(uid: str, email: str, action: str, details: str = ""):
+    record = {"uid": uid, "email": email, "action": action, "details": details, "created_at": None}
     try:
-        execute_query(
-            "INSERT INTO activity_log (uid, email, action, details) VALUES (%s, %s, %s, %s)",
-            (uid, email, action, details),
-        )
+        _insert_activity([record])
+    except DatabaseUnavailable:
+        # Keep the audit trail through an outage; replayed by the next entry that gets through
+        spool.append("activity", {**record, "created_at": datetime.now().isoformat()})
+        return
     except Exception:
-        pass  # Don't break main flow if logging fails
+        return  # Don't break main flow if logging fails
+    if spool.pending("activity"):
+        try:
+            spool.replay("activity", _insert_activity)
+        except Exception:
+            pass  # re-queued by spool.replay
 
 
 @app.get("/activity/{uid}", tags=["Activity"])
-def get_user_activity(uid: str, limit: int = 20):
+def get_user_activity(uid: str, request: Request, response: Response, limit: int = 20):
     """Get recent activity log for a user."""
+    not_modified = check_not_modified(request, response, "activity_log")
+    if not_modified:
+        return not_modified
     logs = execute_query(
         "SELECT * FROM activity_log WHERE uid = %s ORDER BY created_at DESC LIMIT %s",
         (uid, limit),
@@ -372,8 +1028,11 @@ def get_user_activity(uid: str, limit: int = 20):
 
 
 @app.get("/activity/admin/all", tags=["Activity"])
-def get_all_activity(limit: int = 50):
+def get_all_activity(request: Request, response: Response, limit: int = 50):
     """Admin: Get all recent activity."""
+    not_modified = check_not_modified(request, response, "activity_log")
+    if not_modified:
+        return not_modified
     logs = execute_query(
         "SELECT * FROM activity_log ORDER BY created_at DESC LIMIT %s",
         (limit,),
@@ -383,19 +1042,53 @@ def get_all_activity(limit: int = 50):
 
 
 # ── STATS ─────────────────────────────────────────────────────────────────────
+STATS_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM users) AS total_users,
+        (SELECT COUNT(*) FROM transfer_history) AS total_transfers,
+        COUNT(*) AS total_assets,
+        COUNT(*) FILTER (WHERE status = 'Active') AS active_assets,
+        COUNT(*) FILTER (WHERE status = 'Pending') AS pending_assets
+    FROM assets
+"""
+
+
 @app.get("/stats", tags=["Stats"])
-def get_stats():
+def get_stats(request: Request, response: Response):
     """Admin: Get platform statistics."""
-    total_users = execute_one("SELECT COUNT(*) as count FROM users")
-    total_assets = execute_one("SELECT COUNT(*) as count FROM assets")
-    total_transfers = execute_one("SELECT COUNT(*) as count FROM transfer_history")
-    active_assets = execute_one("SELECT COUNT(*) as count FROM assets WHERE status = 'Active'")
-    pending_assets = execute_one("SELECT COUNT(*) as count FROM assets WHERE status = 'Pending'")
+    not_modified = check_not_modified(request, response, "users", "assets", "transfer_history")
+    if not_modified:
+        return not_modified
+    return execute_one(STATS_QUERY)
+
 
+@app.get("/admin/overview", tags=["Stats"])
+def get_admin_overview(
+    request: Request,
+    response: Response,
+    assets_limit: int = Query(5, ge=1, le=100),
+    activity_limit: int = Query(8, ge=1, le=100),
+):
+    """Admin: Stats, most recent assets and most recent activity in one round trip."""
+    not_modified = check_not_modified(request, response, "users", "assets", "transfer_history", "activity_log")
+    if not_modified:
+        return not_modified
+    stats, recent_assets, recent_activity = execute_read_batch([
+        (STATS_QUERY, None),
+        (
+            """
+            SELECT a.*, u.email as owner_email, u.username as owner_name
+            FROM assets a
+            LEFT JOIN users u ON a.owner_uid = u.uid
+            ORDER BY a.created_at DESC
+            LIMIT %s
+            """,
+            (assets_limit,),
+        ),
+        ("SELECT * FROM activity_log ORDER BY created_at DESC LIMIT %s", (activity_limit,)),
+    ])
     return {
-        "total_users": total_users["count"] if total_users else 0,
-        "total_assets": total_assets["count"] if total_assets else 0,
-        "total_transfers": total_transfers["count"] if total_transfers else 0,
-        "active_assets": active_assets["count"] if active_assets else 0,
-        "pending_assets": pending_assets["count"] if pending_assets else 0,
+        "stats": stats[0],
+        "recent_assets": recent_assets,
+        "recent_activity": recent_activity,
     }
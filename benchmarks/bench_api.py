@@ -0,0 +1,304 @@
+"""
+bench_api.py — Load test for the AssetBlock API against a throwaway Postgres.
+Starts a private cluster with initdb/pg_ctl (or uses an existing server via
+--pg-host/--pg-port), creates the schema, bulk-seeds users, assets, transfers
+and activity with src/seed.py, replaces Firebase auth with a fake (a token is
+just the uid), and drives the FastAPI app in-process over httpx's ASGI
+transport with concurrent workloads. Prints p50/p95/p99 latency and throughput per
+endpoint; --json writes the same results for comparing runs.
+Run: python benchmarks/bench_api.py --assets 20000 --requests 500 --concurrency 16 --json run.json
+"""
+
+import argparse
+import asyncio
+import glob
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src"))
+
+SCENARIOS = ("stats", "read", "search", "upload", "transfer")
+SEARCH_TERMS = ("report", "photo", "contract", "scan", "invoice", "model", "ab", "2024")
+
+
+# ── Postgres stand-in ─────────────────────────────────────────────────────────
+def _pg_binary(name: str) -> str:
+    found = shutil.which(name) or next(iter(sorted(glob.glob(f"/usr/lib/postgresql/*/bin/{name}"), reverse=True)), None)
+    if not found:
+        raise SystemExit(f"{name} not found: install PostgreSQL server binaries or pass --pg-host/--pg-port")
+    return found
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalPostgres:
+    """Private cluster in a temp dir (trust auth, unix socket + loopback), removed on stop()."""
+
+    def __init__(self, fsync: bool = False):
+        self.fsync = fsync
+        self.dir = Path(tempfile.mkdtemp(prefix="assetblock-pg-"))
+        self.data = self.dir / "data"
+        self.port = _free_port()
+
+    def start(self):
+        subprocess.run(
+            [_pg_binary("initdb"), "-D", str(self.data), "-U", "postgres", "-A", "trust", "--no-sync"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        options = f"-p {self.port} -k {self.dir} -c listen_addresses=127.0.0.1 -c fsync={'on' if self.fsync else 'off'}"
+        subprocess.run(
+            [_pg_binary("pg_ctl"), "-D", str(self.data), "-o", options, "-l", str(self.dir / "server.log"), "-w", "start"],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        return self
+
+    def stop(self):
+        subprocess.run([_pg_binary("pg_ctl"), "-D", str(self.data), "-m", "fast", "-w", "stop"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def configure_environment(host: str, port: int, user: str, password: str, db: str):
+    """Point database.py / process.py at the bench server (read at import, so call first)."""
+    os.environ.pop("DATABASE_URL", None)  # forces sslmode=require; a local cluster has no TLS
+    os.environ.update({
+        "POSTGRE_HOST": host, "POSTGRE_PORT": str(port), "POSTGRE_USER": user,
+        "POSTGRE_PASSWORD": password, "POSTGRE_DB": db,
+        "ASSETBLOCK_BLOB_DIR": "", "ASSETBLOCK_SLOW_QUERY_MS": "0",
+        # Measure endpoint cost, not 429 load shedding (rate_limit.py)
+        "ASSETBLOCK_RATE_LIMIT_UID": "0", "ASSETBLOCK_RATE_LIMIT_IP": "0",
+        "ASSETBLOCK_MAX_EXPENSIVE_CONCURRENCY": "0",
+    })
+
+
+def install_fake_firebase():
+    """api.py initialises firebase_admin at import; stand in with a token == uid verifier."""
+    firebase_admin = types.ModuleType("firebase_admin")
+    firebase_admin._apps = {"[DEFAULT]": object()}
+    firebase_admin.initialize_app = lambda *args, **kwargs: None
+    firebase_admin.credentials = types.ModuleType("firebase_admin.credentials")
+    firebase_admin.credentials.Certificate = lambda *args, **kwargs: None
+    firebase_admin.auth = types.ModuleType("firebase_admin.auth")
+    firebase_admin.auth.verify_id_token = lambda token: {"uid": token}
+    sys.modules.update({
+        "firebase_admin": firebase_admin,
+        "firebase_admin.credentials": firebase_admin.credentials,
+        "firebase_admin.auth": firebase_admin.auth,
+    })
+
+
+# ── Seeding ───────────────────────────────────────────────────────────────────
+MOVABLE_ASSETS = 100_000
+
+
+def seed_database(users: int, assets: int, transfers: int, activity: int, seed: int, workers: int) -> dict:
+    """Bulk-load with src/seed.py; returns what the workloads need (uids, emails, owners)."""
+    import seed as seeder
+    from database import execute_query
+
+    summary = seeder.seed(users, assets, transfers, activity, seed, workers)
+    uids = [seeder.user_uid(seed, i) for i in range(users)]
+    emails = [seeder.user_email(seed, i) for i in range(users)]
+    rows = execute_query(
+        "SELECT id, owner_uid FROM assets WHERE id >= %s ORDER BY id LIMIT %s",
+        (summary["asset_id_base"], MOVABLE_ASSETS),
+        fetch=True,
+    )
+    return {"uids": uids, "emails": emails, "owners": {row["id"]: row["owner_uid"] for row in rows}, "seed": summary}
+
+
+# ── Workloads ─────────────────────────────────────────────────────────────────
+def build_scenarios(data: dict, rng: random.Random, upload_size: int) -> dict:
+    """name -> callable(i) returning (method, url, request kwargs)."""
+    uids, emails = data["uids"], data["emails"]
+    email_of = dict(zip(uids, emails))
+    movable = list(data["owners"].items())
+    rng.shuffle(movable)
+    nonce, uploaded = time.time_ns(), itertools.count()
+
+    def stats(i):
+        return "GET", "/stats", {}
+
+    def read(i):
+        return "GET", "/assets/read", {"params": {"limit": 50, "offset": rng.randrange(0, max(len(movable), 1))}}
+
+    def search(i):
+        return "GET", f"/assets/search/{rng.choice(SEARCH_TERMS)}", {}
+
+    def upload(i):
+        uid = rng.choice(uids)
+        # Unique across warmup and timed passes, or repeats would come back 409
+        body = f"{nonce}-{next(uploaded)}".encode().ljust(upload_size, b"\0")
+        return "POST", "/assets/upload", {
+            "data": {"owner_uid": uid, "owner_email": email_of[uid], "description": "bench upload"},
+            "files": {"file": (f"bench-{i}.bin", body, "application/octet-stream")},
+        }
+
+    def transfer(i):
+        # Each request moves a different asset so concurrent requests don't race on ownership
+        asset_id, owner = movable[i % len(movable)]
+        recipient = rng.choice(uids)
+        while recipient == owner:
+            recipient = rng.choice(uids)
+        movable[i % len(movable)] = (asset_id, recipient)
+        return "POST", "/assets/transfer", {"json": {"asset_id": asset_id, "from_uid": owner, "to_email": email_of[recipient]}}
+
+    return {"stats": stats, "read": read, "search": search, "upload": upload, "transfer": transfer}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+async def drive(client, build, requests: int, concurrency: int) -> dict:
+    latencies, statuses = [], Counter()
+    jobs = iter(range(requests))  # shared by all workers: each index is sent once
+
+    async def worker():
+        for i in jobs:
+            method, url, kwargs = build(i)
+            start = time.perf_counter()
+            try:
+                status = (await client.request(method, url, **kwargs)).status_code
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[str(status)] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": ok,
+        "errors": requests - ok,
+        "statuses": dict(statuses),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "rps": round(requests / wall, 1) if wall else None,
+        "wall_s": round(wall, 3),
+    }
+
+
+async def run_workloads(app, scenarios: dict, names, requests: int, concurrency: int, warmup: int) -> list:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+        for name in names:
+            if warmup:
+                await drive(client, scenarios[name], warmup, min(concurrency, warmup))
+            result = await drive(client, scenarios[name], requests, concurrency)
+            results.append({"endpoint": name, **result})
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "-C", str(ROOT), "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--assets", type=int, default=10_000)
+    parser.add_argument("--transfers", type=int, default=5_000)
+    parser.add_argument("--activity", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed for data and request mix")
+    parser.add_argument("--seed-workers", type=int, default=os.cpu_count() or 4, help="parallel COPY loaders")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per scenario")
+    parser.add_argument("--upload-size", type=int, default=256 * 1024, help="bytes per uploaded file")
+    parser.add_argument("--pg-host", help="use this server instead of a throwaway cluster")
+    parser.add_argument("--pg-port", type=int, default=5432)
+    parser.add_argument("--pg-user", default="postgres")
+    parser.add_argument("--pg-password", default="")
+    parser.add_argument("--pg-db", default="assetblock_bench", help="reusing it needs a different --seed")
+    parser.add_argument("--fsync", action="store_true", help="keep fsync on in the throwaway cluster")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+    if args.users < 2:
+        parser.error("--users must be at least 2 (transfers need a recipient)")
+
+    cluster = None if args.pg_host else LocalPostgres(fsync=args.fsync).start()
+    try:
+        host = args.pg_host or "127.0.0.1"
+        port = args.pg_port if args.pg_host else cluster.port
+        configure_environment(host, port, args.pg_user, args.pg_password, args.pg_db)
+        install_fake_firebase()
+
+        import process
+        process.create_database()
+        process.create_tables()
+
+        started = time.perf_counter()
+        data = seed_database(args.users, args.assets, args.transfers, args.activity, args.seed, args.seed_workers)
+        seed_seconds = time.perf_counter() - started
+
+        from api import app
+        scenarios = build_scenarios(data, random.Random(args.seed), args.upload_size)
+        results = asyncio.run(
+            run_workloads(app, scenarios, args.scenarios, args.requests, args.concurrency, args.warmup)
+        )
+    finally:
+        if cluster:
+            cluster.stop()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "postgres": "throwaway cluster" if cluster else f"{args.pg_host}:{args.pg_port}",
+            "fsync": args.fsync if cluster else None,
+            "seed_seconds": round(seed_seconds, 2),
+            "seed": data["seed"],
+            "config": {k: v for k, v in vars(args).items() if k not in ("pg_password", "json")},
+        },
+        "results": results,
+    }
+    print(f"{'endpoint':<10} {'ok':>6} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for row in results:
+        print(f"{row['endpoint']:<10} {row['ok']:>6} {row['errors']:>5} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['rps'] or 0:>8.1f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
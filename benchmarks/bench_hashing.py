@@ -0,0 +1,214 @@
+"""
+bench_hashing.py — Throughput of the file-hashing APIs in sha256_hash.py.
+Compares the legacy in-memory generate_hash against hash_stream (readinto),
+hash_file (mmap and plain reads), the parallel Merkle fingerprint and the
+multi-file hash_many pool, across file sizes, chunk sizes and worker counts.
+Each measurement runs in a fresh subprocess so its peak RSS is its own;
+results include MB/s, MB/s per core used and MB per CPU-second.
+Run: python benchmarks/bench_hashing.py --sizes 1K 1M 64M 1G 10G --chunks 64K 1M 4M --workers 1 4 8
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, so no CPU time or RSS columns
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sha256_hash import generate_hash, hash_file, hash_many, hash_stream, merkle_hash_file  # noqa: E402
+
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+CPUS = os.cpu_count() or 1
+
+
+def parse_size(text: str) -> int:
+    """'64K' / '512M' / '2G' / '1000' -> bytes."""
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(text)
+
+
+def make_file(directory: str, size: int) -> str:
+    """Write `size` random-ish bytes in 1 MB blocks (never holds the whole file)."""
+    path = os.path.join(directory, f"bench-{size}.bin")
+    block = os.urandom(min(size, 1024 * 1024)) if size else b""
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+    return path
+
+
+# ── Modes: fn(path, chunk_size, workers) -> digest ────────────────────────────
+def legacy(path, chunk_size, workers):
+    # What the API did before streaming: read everything, then hash
+    with open(path, "rb") as f:
+        return generate_hash(f.read())
+
+
+def stream(path, chunk_size, workers):
+    with open(path, "rb", buffering=0) as f:
+        return hash_stream(f, chunk_size)
+
+
+def mapped(path, chunk_size, workers):
+    return hash_file(path, chunk_size)
+
+
+def read(path, chunk_size, workers):
+    return hash_file(path, chunk_size, use_mmap=False)
+
+
+def merkle(path, chunk_size, workers):
+    return merkle_hash_file(path, chunk_size, workers)
+
+
+def many(path, chunk_size, workers):
+    # `workers` copies of the same file: aggregate throughput of the pool
+    digests = {r.digest for r in hash_many([path] * workers, workers=workers, chunk_size=chunk_size)}
+    return digests.pop() if len(digests) == 1 else f"disagree:{sorted(digests)}"
+
+
+# name -> (fn, uses chunk size, uses workers, digest family)
+MODES = {
+    "generate_hash": (legacy, False, False, "sha256"),
+    "hash_stream": (stream, True, False, "sha256"),
+    "hash_file": (mapped, True, False, "sha256"),
+    "hash_file_read": (read, True, False, "sha256"),
+    "merkle": (merkle, True, True, "merkle"),
+    "hash_many": (many, True, True, "sha256"),
+}
+
+
+def _usage():
+    if resource is None:
+        return None, None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return usage.ru_utime + usage.ru_stime, rss
+
+
+def measure(mode: str, path: str, size: int, chunk_size: int, workers: int, repeat: int) -> dict:
+    """Best-of-`repeat` wall time (first run also warms the page cache) plus CPU time and peak RSS."""
+    fn = MODES[mode][0]
+    _, rss_before = _usage()
+    best, best_cpu, digest = float("inf"), None, None
+    for _ in range(repeat):
+        cpu_start, _ = _usage()
+        start = time.perf_counter()
+        digest = fn(path, chunk_size, workers)
+        elapsed = time.perf_counter() - start
+        cpu_end, _ = _usage()
+        if elapsed < best:
+            best, best_cpu = elapsed, (cpu_end - cpu_start) if cpu_start is not None else None
+    _, rss_peak = _usage()
+
+    processed = size * (workers if mode == "hash_many" else 1)
+    cores = min(workers, CPUS) if MODES[mode][2] else 1
+    mb = processed / 1024 ** 2
+    return {
+        "mode": mode,
+        "size": size,
+        "chunk_size": chunk_size if MODES[mode][1] else None,
+        "workers": workers if MODES[mode][2] else 1,
+        "seconds": round(best, 6),
+        "mb_per_s": round(mb / best, 1) if best else None,
+        "mb_per_s_per_core": round(mb / best / cores, 1) if best else None,
+        "mb_per_cpu_s": round(mb / best_cpu, 1) if best_cpu else None,
+        "peak_rss_mb": round(rss_peak / 1024 ** 2, 1) if rss_peak else None,
+        "rss_growth_mb": round((rss_peak - rss_before) / 1024 ** 2, 1) if rss_peak else None,
+        "digest": digest,
+    }
+
+
+def measure_isolated(*args) -> dict:
+    """measure() in a fresh interpreter so peak RSS is not inherited from earlier runs."""
+    out = subprocess.run(
+        [sys.executable, __file__, "--child", json.dumps(args)], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out)
+
+
+def run(sizes, chunks, workers_list, modes, repeat, legacy_max, directory=None, isolate=True):
+    results = []
+    with tempfile.TemporaryDirectory(prefix="assetblock-bench-", dir=directory) as tmp:
+        for size in sizes:
+            path = make_file(tmp, size)
+            expected = {}
+            for mode in modes:
+                _, uses_chunk, uses_workers, family = MODES[mode]
+                if mode == "generate_hash" and size > legacy_max:
+                    continue  # reads the whole file into memory
+                for chunk_size in chunks if uses_chunk else chunks[:1]:
+                    for workers in workers_list if uses_workers else [1]:
+                        args = (mode, path, size, chunk_size, workers, repeat)
+                        row = measure_isolated(*args) if isolate else measure(*args)
+                        digest = row.pop("digest")
+                        # A Merkle root depends on the chunk size; plain SHA-256 does not
+                        key = (family, chunk_size if family == "merkle" else None)
+                        expected.setdefault(key, digest)
+                        if digest != expected[key]:
+                            raise SystemExit(f"{mode} disagrees on {size} bytes: {digest} != {expected[key]}")
+                        results.append(row)
+                        print_row(row)
+            os.unlink(path)
+    return results
+
+
+HEADER = (f"{'mode':<15} {'size':>12} {'chunk':>9} {'wrk':>4} {'seconds':>10} {'MB/s':>9} "
+          f"{'MB/s/core':>10} {'MB/cpu-s':>9} {'RSS MB':>8}")
+
+
+def print_row(row):
+    print(f"{row['mode']:<15} {row['size']:>12} {row['chunk_size'] or '-':>9} {row['workers']:>4} "
+          f"{row['seconds']:>10.4f} {row['mb_per_s'] or 0:>9.1f} {row['mb_per_s_per_core'] or 0:>10.1f} "
+          f"{row['mb_per_cpu_s'] or 0:>9.1f} {row['peak_rss_mb'] or 0:>8.1f}", flush=True)
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(measure(*json.loads(sys.argv[2]))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1K", "1M", "64M", "256M"])
+    parser.add_argument("--chunks", nargs="+", default=["64K", "1M", "4M"])
+    parser.add_argument("--workers", nargs="+", type=int, default=sorted({1, min(4, CPUS), CPUS}),
+                        help="worker counts for merkle and hash_many")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max", default="2G", help="skip generate_hash above this size")
+    parser.add_argument("--dir", help="where to write test files (10G runs need the space)")
+    parser.add_argument("--in-process", action="store_true", help="no subprocess per run (RSS is then cumulative)")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    print(HEADER)
+    results = run(
+        [parse_size(s) for s in args.sizes],
+        [parse_size(c) for c in args.chunks],
+        args.workers,
+        args.modes,
+        args.repeat,
+        parse_size(args.legacy_max),
+        args.dir,
+        isolate=not args.in_process,
+    )
+    if args.json:
+        Path(args.json).write_text(json.dumps({"cpus": CPUS, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+blob_store.py — Content-addressed local storage for uploaded asset bytes.
+Blobs are keyed by their SHA-256 and fanned out as <root>/ab/cd/<hash>,
+so identical uploads are stored once. Enabled by ASSETBLOCK_BLOB_DIR.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from sha256_hash import new_hasher
+
+TMP_MAX_AGE = 24 * 3600  # abandoned partial uploads older than this are swept
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def is_valid_digest(digest: str) -> bool:
+    """True for a lowercase 64-char hex SHA-256 (guards path construction)."""
+    return len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+
+
+class BlobWriter:
+    """
+    Streams one upload into a temp file inside the store while hashing it.
+    Quacks like a hashlib object (update / hexdigest); commit() renames the
+    temp file into its content address, abort() discards it.
+    """
+
+    def __init__(self, store: "BlobStore"):
+        self._store = store
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.tmp_dir, prefix="upload-")
+        self._file = os.fdopen(fd, "wb")
+        self._hasher = new_hasher()
+        self._done = False
+        self.size = 0
+
+    def update(self, chunk: bytes):
+        self._hasher.update(chunk)
+        self._file.write(chunk)
+        self.size += len(chunk)
+
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+    def commit(self) -> str:
+        """Atomically publish the blob under its hash; a no-op copy if it already exists."""
+        digest = self.hexdigest()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        final = self._store.path_for(digest)
+        if final.exists():
+            os.unlink(self._tmp_path)
+        else:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(self._tmp_path, final)
+            _fsync_dir(final.parent)
+        self._done = True
+        return digest
+
+    def abort(self):
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.abort()
+
+
+class BlobStore:
+    """Filesystem blob store rooted at `root` (temp files live in <root>/tmp)."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.sweep_tmp()
+
+    def path_for(self, digest: str) -> Path:
+        if not is_valid_digest(digest):
+            raise ValueError(f"Not a SHA-256 hex digest: {digest!r}")
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        return is_valid_digest(digest) and self.path_for(digest).is_file()
+
+    def size(self, digest: str) -> int:
+        return self.path_for(digest).stat().st_size
+
+    def open(self, digest: str):
+        return open(self.path_for(digest), "rb")
+
+    def iter_range(self, digest: str, start: int, end: int, chunk_size: int = READ_CHUNK_SIZE):
+        """Yield bytes start..end (inclusive) in fixed-size chunks; memory stays constant."""
+        with self.open(digest) as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def write_leaves(self, digest: str, chunk_size: int, leaves: list):
+        """Persist a blob's Merkle leaves next to it so proofs don't re-read the bytes."""
+        path = self.path_for(digest).with_name(f"{digest}.merkle.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, prefix="leaves-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"chunk_size": chunk_size, "leaves": leaves}, f)
+        os.replace(tmp_path, path)
+
+    def read_leaves(self, digest: str) -> Optional[dict]:
+        """{"chunk_size": ..., "leaves": [...]} or None if never recorded."""
+        path = self.path_for(digest).with_name(f"{digest}.merkle.json")
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def sweep_tmp(self, max_age: float = TMP_MAX_AGE):
+        """Remove partial uploads left behind by crashed workers."""
+        cutoff = time.time() - max_age
+        for entry in self.tmp_dir.iterdir():
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    entry.unlink()
+            except OSError:
+                pass
+
+
+def _fsync_dir(path: Path):
+    # Persist the rename itself; directories can't be opened for fsync on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> Optional[BlobStore]:
+    """The configured store, or None when ASSETBLOCK_BLOB_DIR is unset."""
+    global _store
+    blob_dir = os.getenv("ASSETBLOCK_BLOB_DIR")
+    if not blob_dir:
+        return None
+    if _store is None:
+        _store = BlobStore(blob_dir)
+    return _store
@@ -0,0 +1,277 @@
+"""
+cli.py — AssetBlock command-line tools.
+  python cli.py ingest <dir> --owner-uid UID --owner-email EMAIL
+Walks a directory tree, hashes files in parallel (through the local hash
+cache), skips hashes the API already knows and uploads the rest over a
+pooled keep-alive client with bounded concurrency. Progress is
+checkpointed so an interrupted run resumes where it stopped.
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+
+from hash_cache import HashCache
+
+_env_path = Path(__file__).resolve().parent / ".env"
+load_dotenv(_env_path)
+
+DEFAULT_API = os.getenv("API_BASE_URL", "http://localhost:8000")
+EXISTS_BATCH = 500  # matches the API's per-request cap with headroom
+# 429 (rate limited / busy), 503 (database down) and 409 (same Idempotency-Key still
+# in progress) carry Retry-After; wait it out this many times
+BACKOFF_ATTEMPTS = 6
+MAX_BACKOFF_SECONDS = 60.0
+
+
+# ── Checkpoint ────────────────────────────────────────────────────────────────
+class Checkpoint:
+    """Append-only JSONL record of finished files, keyed by (path, size, mtime)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.done = set()
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self.done.add((entry["path"], entry["size"], entry["mtime_ns"]))
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str, st: os.stat_result) -> tuple:
+        return path, st.st_size, st.st_mtime_ns
+
+    def record(self, path: str, st: os.stat_result, digest: str, outcome: str):
+        entry = {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest, "outcome": outcome}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# ── Progress ──────────────────────────────────────────────────────────────────
+class Progress:
+    """Thread-safe counters plus a one-line throughput / ETA report on stderr."""
+
+    def __init__(self, files_total: int, bytes_total: int):
+        self.files_total, self.bytes_total = files_total, bytes_total
+        self.hashed_bytes = self.done_bytes = 0
+        self.counts = {"uploaded": 0, "duplicate": 0, "failed": 0}
+        self.uploaded_bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._last_print = 0.0
+
+    def hashed(self, size: int):
+        with self._lock:
+            self.hashed_bytes += size
+
+    def finished(self, outcome: str, size: int):
+        with self._lock:
+            self.counts[outcome] += 1
+            self.done_bytes += size
+            if outcome == "uploaded":
+                self.uploaded_bytes += size
+        self.report()
+
+    def report(self, final: bool = False):
+        now = time.monotonic()
+        if not final and now - self._last_print < 1.0:
+            return
+        self._last_print = now
+        elapsed = max(now - self.started, 1e-6)
+        rate = self.done_bytes / elapsed
+        eta = (self.bytes_total - self.done_bytes) / rate if rate else 0
+        done = sum(self.counts.values())
+        line = (
+            f"{done}/{self.files_total} files · hashed {self.hashed_bytes / 1e6:,.1f} MB · "
+            f"uploaded {self.counts['uploaded']} ({self.uploaded_bytes / 1e6:,.1f} MB) · "
+            f"dup {self.counts['duplicate']} · failed {self.counts['failed']} · "
+            f"{rate / 1e6:,.1f} MB/s · ETA {eta:,.0f}s"
+        )
+        print("\r" + line, end="\n" if final else "", file=sys.stderr, flush=True)
+
+
+# ── Ingest ────────────────────────────────────────────────────────────────────
+def walk_files(root: Path):
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield os.path.abspath(path)
+
+
+def backoff_delay(r: httpx.Response, attempt: int) -> float:
+    try:
+        delay = float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        delay = 2.0 ** attempt
+    return min(delay, MAX_BACKOFF_SECONDS)
+
+
+def post_with_backoff(client: httpx.Client, url: str, open_body=None, **kwargs) -> httpx.Response:
+    """POST, sleeping through answers with Retry-After; open_body() re-opens the upload for each attempt."""
+    for attempt in range(BACKOFF_ATTEMPTS):
+        if open_body is None:
+            r = client.post(url, **kwargs)
+        else:
+            with open_body() as files:
+                r = client.post(url, files=files, **kwargs)
+        retry = r.status_code in (429, 503) or (r.status_code == 409 and "Retry-After" in r.headers)
+        if not retry or attempt == BACKOFF_ATTEMPTS - 1:
+            return r
+        time.sleep(backoff_delay(r, attempt))
+
+
+@contextmanager
+def _upload_file(path: str):
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        yield {"file": (os.path.basename(path), f, mime)}
+
+
+def upload_one(client: httpx.Client, path: str, digest: str, root: Path, args) -> str:
+    """
+    Upload one file; returns 'uploaded', 'duplicate' or raises. The content
+    hash is the Idempotency-Key, so a retry after a timeout is replayed by
+    the API instead of re-uploading and re-hashing.
+    """
+    r = post_with_backoff(
+        client,
+        "/assets/upload",
+        open_body=lambda: _upload_file(path),
+        data={
+            "owner_uid": args.owner_uid,
+            "owner_email": args.owner_email,
+            "description": args.description or f"Ingested from {os.path.relpath(path, root)}",
+        },
+        headers={"Idempotency-Key": f"ingest-{digest}-{args.owner_uid}", "Idempotency-Payload-Digest": digest},
+        timeout=httpx.Timeout(30.0, write=None),
+    )
+    # A 409 with Retry-After means our own earlier attempt is still running, not a duplicate
+    if r.status_code == 409 and "Retry-After" not in r.headers:
+        return "duplicate"
+    r.raise_for_status()
+    return "uploaded"
+
+
+def ingest(args) -> int:
+    root = Path(args.directory).resolve()
+    checkpoint = Checkpoint(Path(args.checkpoint or root / ".assetblock-ingest.jsonl").resolve())
+    stats, skipped = {}, 0
+    for path in walk_files(root):
+        if path == str(checkpoint.path):
+            continue
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"skipped: {path}: {e}", file=sys.stderr)  # removed or unreadable since the walk
+            continue
+        if Checkpoint.key(path, st) in checkpoint.done:
+            skipped += 1
+        else:
+            stats[path] = st
+    if skipped:
+        print(f"Resuming: {skipped} file(s) already done per checkpoint", file=sys.stderr)
+
+    progress = Progress(len(stats), sum(st.st_size for st in stats.values()))
+    limits = httpx.Limits(max_connections=args.uploads, max_keepalive_connections=args.uploads)
+    transport = httpx.HTTPTransport(retries=3, limits=limits)
+    failures = 0
+
+    # Identifies the owner to the API; rate limits apply per IP unless this host is trusted
+    headers = {"X-AssetBlock-Uid": args.owner_uid}
+    with httpx.Client(base_url=args.api, transport=transport, headers=headers) as client, \
+            ThreadPoolExecutor(max_workers=args.uploads) as uploader, \
+            HashCache(args.cache) as cache:
+        in_flight = {}
+
+        def drain(block_until: int):
+            """Wait until at most `block_until` uploads are in flight."""
+            nonlocal failures
+            while len(in_flight) > block_until:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, digest = in_flight.pop(future)
+                    try:
+                        outcome = future.result()
+                        checkpoint.record(path, stats[path], digest, outcome)
+                    except Exception as e:
+                        outcome = "failed"
+                        failures += 1
+                        print(f"\nupload failed: {path}: {e}", file=sys.stderr)
+                    progress.finished(outcome, stats[path].st_size)
+
+        def flush(batch):
+            hashes = [digest for _, digest in batch]
+            r = post_with_backoff(client, "/assets/exists", json={"hashes": hashes}, timeout=30.0)
+            r.raise_for_status()
+            existing = r.json()["existing"]
+            for path, digest in batch:
+                if digest in existing:
+                    checkpoint.record(path, stats[path], digest, "duplicate")
+                    progress.finished("duplicate", stats[path].st_size)
+                    continue
+                drain(args.uploads * 2 - 1)  # bounded queue: never more than 2x the connection pool
+                in_flight[uploader.submit(upload_one, client, path, digest, root, args)] = (path, digest)
+
+        batch = []
+        for result in cache.hash_many(stats, workers=args.workers):
+            if result.error:
+                failures += 1
+                print(f"\nhash failed: {result.path}: {result.error}", file=sys.stderr)
+                progress.finished("failed", result.size)
+                continue
+            progress.hashed(result.size)
+            batch.append((result.path, result.digest))
+            if len(batch) >= EXISTS_BATCH:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        drain(0)
+
+    checkpoint.close()
+    progress.report(final=True)
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="assetblock", description="AssetBlock command-line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("ingest", help="hash and register every file under a directory")
+    p.add_argument("directory")
+    p.add_argument("--owner-uid", required=True)
+    p.add_argument("--owner-email", required=True)
+    p.add_argument("--description", default="", help="description for every asset (default: relative path)")
+    p.add_argument("--api", default=DEFAULT_API, help=f"API base URL (default {DEFAULT_API})")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="parallel hashing workers")
+    p.add_argument("--uploads", type=int, default=4, help="concurrent uploads / pooled connections")
+    p.add_argument("--checkpoint", help="checkpoint file (default <dir>/.assetblock-ingest.jsonl)")
+    p.add_argument("--cache", help="hash cache database (default ~/.assetblock/hash_cache.sqlite3)")
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        sys.exit(ingest(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,11 @@ Run: streamlit run src/client/client.py
 
 import streamlit as st
 import requests
+import hashlib
+import time
+import uuid
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pyrebase
 import os
 from datetime import datetime
@@ -363,17 +368,117 @@ init_session()
 
 
 # ── API Helpers ────────────────────────────────────────────────────────────────
+GET_CACHE_TTL = 5       # seconds a GET response is reused without asking the API
+GET_CACHE_SIZE = 64
+
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    """Process-wide keep-alive session: pooled connections, retried GETs."""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        # Not 503: the API answers that at once while the database is down (see Retry-After)
+        status_forcelist=(502, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def invalidate_get_cache():
+    """Force revalidation of every cached GET after this session writes."""
+    cache = st.session_state.setdefault("http_cache", {})
+    for endpoint, (_, etag, data) in cache.items():
+        cache[endpoint] = (0.0, etag, data)
+
+
+def caller_headers(**extra) -> dict:
+    """Identify the signed-in user to the API's per-user rate limiter."""
+    if st.session_state.get("uid"):
+        extra["X-AssetBlock-Uid"] = st.session_state.uid
+    return extra
+
+
+def show_degraded_banner(slot):
+    """Fill `slot` (an st.empty() at the top of the page) if any read this run was degraded."""
+    degraded = st.session_state.get("api_degraded")
+    if degraded == "stale":
+        slot.warning("The database is temporarily unavailable. Showing the last known data; "
+                     "changes will fail until it recovers.")
+    elif degraded == "down":
+        slot.warning("The database is temporarily unavailable. Please retry in a few seconds.")
+    elif degraded == "throttled":
+        slot.warning("Too many requests right now. Showing the last known data; please slow down.")
+
+
 def api_get(endpoint: str):
+    # Fresh entries are served locally; stale ones are revalidated by ETag
+    cache = st.session_state.setdefault("http_cache", {})
+    cached = cache.get(endpoint)
+    if cached and time.monotonic() - cached[0] < GET_CACHE_TTL:
+        return cached[2]
+    headers = caller_headers(**({"If-None-Match": cached[1]} if cached and cached[1] else {}))
     try:
-        r = requests.get(f"{API}{endpoint}", timeout=10)
-        return r.json() if r.status_code == 200 else None
+        r = http_session().get(f"{API}{endpoint}", headers=headers, timeout=10)
+        if r.status_code == 304 and cached:
+            cache[endpoint] = (time.monotonic(), cached[1], cached[2])
+            return cached[2]
+        if r.status_code == 429:
+            st.session_state.api_degraded = "throttled"
+            return cached[2] if cached else None
+        if r.status_code == 503:
+            # Database down: keep showing what this session last saw
+            st.session_state.api_degraded = "stale" if cached else "down"
+            return cached[2] if cached else None
+        if r.status_code != 200:
+            return None
+        data = r.json()
+        if r.headers.get("X-AssetBlock-Stale"):
+            st.session_state.api_degraded = "stale"
+            return data  # never cached as fresh
+        cache.pop(endpoint, None)
+        cache[endpoint] = (time.monotonic(), r.headers.get("ETag"), data)
+        if len(cache) > GET_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        return data
     except Exception:
         return None
 
 
-def api_post(endpoint: str, json=None, data=None, files=None):
+def idempotency_headers(form: str, payload) -> dict:
+    """One Idempotency-Key per form submission: reused on retry, renewed when the payload changes."""
+    keys = st.session_state.setdefault("idempotency_keys", {})
+    digest = hashlib.sha256(repr(payload).encode()).hexdigest()
+    current = keys.get(form)
+    if not current or current[0] != digest:
+        current = keys[form] = (digest, uuid.uuid4().hex)
+    return {"Idempotency-Key": current[1], "Idempotency-Payload-Digest": digest}
+
+
+def settle_idempotency_key(form: str, r):
+    """Forget the key once the API gave a definitive answer (not a 5xx or an in-progress 409)."""
+    if r.status_code < 500 and "Retry-After" not in r.headers:
+        st.session_state.setdefault("idempotency_keys", {}).pop(form, None)
+
+
+def api_post(endpoint: str, json=None, data=None, files=None, form: str = None):
+    """POST; with `form`, a timed-out submission retried by the user is replayed, not redone."""
+    invalidate_get_cache()
+    headers = caller_headers()
+    if form:
+        # Fingerprint file contents, not just name and size, so a different file never replays an old answer
+        file_digests = {name: (f[0], hashlib.sha256(f[1]).hexdigest()) for name, f in (files or {}).items()}
+        headers.update(idempotency_headers(form, (endpoint, json, data, file_digests)))
     try:
-        r = requests.post(f"{API}{endpoint}", json=json, data=data, files=files, timeout=15)
+        r = http_session().post(f"{API}{endpoint}", json=json, data=data, files=files, headers=headers, timeout=15)
+        if form:
+            settle_idempotency_key(form, r)
         return r.status_code, r.json()
     except Exception as e:
         return 500, {"detail": str(e)}
@@ -626,7 +731,7 @@ def page_upload():
                             "owner_email": st.session_state.email,
                             "description": description,
                         }
-                        status, resp = api_post("/assets/upload", data=data, files=files)
+                        status, resp = api_post("/assets/upload", data=data, files=files, form="upload")
                         if status == 200:
                             st.success("✓ Asset registered successfully!")
                             asset = resp.get("asset", {})
@@ -848,7 +953,7 @@ def page_transfer():
                         "from_uid": uid,
                         "to_email": recipient_email,
                         "note": note,
-                    })
+                    }, form="transfer")
                     if status == 200:
                         st.success(f"✓ Asset transferred to {recipient_email}")
                         st.balloons()
@@ -926,7 +1031,9 @@ def main():
         show_auth_page()
         return
 
+    st.session_state.api_degraded = None
     show_sidebar()
+    banner = st.empty()
 
     page = st.session_state.page
     if page == "dashboard":
@@ -940,6 +1047,8 @@ def main():
     elif page == "activity":
         page_activity()
 
+    show_degraded_banner(banner)
+
 
 if __name__ == "__main__":
     main()
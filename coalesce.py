@@ -0,0 +1,115 @@
+"""
+coalesce.py — Single-flight coalescing for expensive identical GET requests.
+When several clients ask for the same read at once (admins refreshing /stats
+or the asset registry together), the first request runs the endpoint and the
+rest wait for its response instead of each running the same queries. Only
+requests that overlap in time are shared; nothing is cached afterwards, so
+freshness is the same as without coalescing.
+"""
+
+import asyncio
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qsl, urlencode
+
+import metrics
+
+SHARED = metrics.CACHE_LOOKUPS.labels("coalesce", "hit")
+LEADERS = metrics.CACHE_LOOKUPS.labels("coalesce", "miss")
+
+_instances = []
+
+
+# ── Key derivation: fn(scope) -> key, or None to skip coalescing ─────────────
+def _if_none_match(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"if-none-match":
+            return value.decode("latin-1")
+    return ""
+
+
+def request_key(scope) -> str:
+    """Path, raw query string and If-None-Match (a 304 and a 200 must not be shared)."""
+    return f"{scope['path']}?{scope['query_string'].decode('latin-1')}|{_if_none_match(scope)}"
+
+
+def sorted_query_key(scope) -> str:
+    """Like request_key, but ?a=1&b=2 and ?b=2&a=1 share one flight."""
+    query = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+    return f"{scope['path']}?{query}|{_if_none_match(scope)}"
+
+
+# ── ASGI middleware ───────────────────────────────────────────────────────────
+class CoalescingMiddleware:
+    """
+    `routes` maps an exact request path to its key function (None means
+    request_key). The leader's response is buffered while it is forwarded,
+    so keep this to JSON endpoints, inside compression so followers get
+    their own Content-Encoding. If the leader fails, each follower runs
+    the endpoint itself.
+    """
+
+    def __init__(self, app, routes: Dict[str, Optional[Callable]]):
+        self.app = app
+        self.routes = {path: key or request_key for path, key in routes.items()}
+        self._flights: Dict[str, asyncio.Future] = {}
+        _instances.append(self)
+
+    def _key(self, scope) -> Optional[str]:
+        key_fn = self.routes.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        return key_fn(scope) if key_fn else None
+
+    def would_join(self, scope) -> bool:
+        """True if this request would wait on a flight already running rather than run the endpoint."""
+        key = self._key(scope)
+        return key is not None and key in self._flights
+
+    async def __call__(self, scope, receive, send):
+        key = self._key(scope)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        flight = self._flights.get(key)
+        if flight is not None:
+            SHARED.inc()
+            response = await asyncio.shield(flight)
+            if response is None:
+                await self.app(scope, receive, send)
+                return
+            start, body, route = response
+            if route is not None:
+                # Followers never reach the router; metrics label them by the leader's route
+                scope["route"] = route
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        LEADERS.inc()
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        start, chunks, complete = None, [], False
+
+        async def capture(message):
+            nonlocal start, complete
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        finally:
+            # Later arrivals start a new flight; current followers get this result
+            del self._flights[key]
+            done = start is not None and complete
+            flight.set_result((start, b"".join(chunks), scope.get("route")) if done else None)
+
+
+def joins_flight(scope) -> bool:
+    """
+    For outer middleware: will a coalescer hand this request a leader's
+    response? Nothing awaits between an outer check and the coalescer, so
+    the answer still holds when the request gets there.
+    """
+    return any(coalescer.would_join(scope) for coalescer in _instances)
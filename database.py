@@ -1,43 +1,331 @@
 """
 database.py — PostgreSQL connection helper for AssetBlock.
 Supports both DATABASE_URL (Supabase/Render) and individual env vars.
+A circuit breaker fails calls fast with DatabaseUnavailable while Postgres
+is down or timing out, and API requests run under an adaptive
+statement_timeout so a slow database cannot tie up every worker.
 """
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+from contextlib import contextmanager
+from collections import deque
+from contextvars import ContextVar
 from dotenv import load_dotenv
+from functools import lru_cache
 from pathlib import Path
+import logging
 import os
+import re
+import threading
+import time
+
+import metrics
 
 # Resolve .env from project root
 _env_path = Path(__file__).resolve().parent / ".env"
 load_dotenv(_env_path)
 
 
-def get_connection():
-    # Prefer DATABASE_URL if provided (Supabase, Render, etc.)
-    database_url = os.getenv("DATABASE_URL")
-    if database_url:
-        return psycopg2.connect(database_url, sslmode="require")
-
-    # Fallback to individual env vars (local dev)
-    return psycopg2.connect(
-        user=os.getenv("POSTGRE_USER", "postgres"),
-        password=os.getenv("POSTGRE_PASSWORD", ""),
-        host=os.getenv("POSTGRE_HOST", "localhost"),
-        port=os.getenv("POSTGRE_PORT", "5432"),
-        database=os.getenv("POSTGRE_DB", "assetblock"),
+# ── Query instrumentation ────────────────────────────────────────────────────
+# Statements slower than this go to the "assetblock.sql" slow-query log (0 disables)
+SLOW_QUERY_MS = float(os.getenv("ASSETBLOCK_SLOW_QUERY_MS", "500"))
+# Attach a plain EXPLAIN plan (never ANALYZE, so writes are not re-run) to slow entries
+SLOW_QUERY_EXPLAIN = os.getenv("ASSETBLOCK_SLOW_QUERY_EXPLAIN", "0") == "1"
+# Add the costliest statement shapes to Server-Timing; off by default, since
+# every client would see internal query structure (the aggregate is always sent)
+SERVER_TIMING_DETAIL = os.getenv("ASSETBLOCK_SERVER_TIMING_DETAIL", "0") == "1"
+SERVER_TIMING_TOP = 3
+
+slow_log = logging.getLogger("assetblock.sql")
+log = logging.getLogger("assetblock.db")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|%\(\w+\)s")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(query) -> str:
+    """Statement shape with literals and placeholders folded to '?', whitespace collapsed."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    return " ".join(_LITERALS.sub("?", str(query)).split())
+
+
+class QueryStats:
+    """SQL statements, time and per-fingerprint breakdown for one HTTP request."""
+
+    __slots__ = ("endpoint", "count", "seconds", "by_fingerprint")
+
+    def __init__(self, endpoint: str = ""):
+        self.endpoint = endpoint
+        self.count = 0
+        self.seconds = 0.0
+        self.by_fingerprint = {}
+
+    def add(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        entry = self.by_fingerprint.setdefault(statement, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing value: the DB total, plus with SERVER_TIMING_DETAIL the costliest
+        statement shapes (xN flags repeats)."""
+        parts = [f'db;desc="{self.count} statements";dur={self.seconds * 1000:.2f}']
+        if not SERVER_TIMING_DETAIL:
+            return parts[0]
+        costliest = sorted(self.by_fingerprint.items(), key=lambda item: -item[1][1])[:SERVER_TIMING_TOP]
+        for n, (statement, (count, seconds)) in enumerate(costliest, 1):
+            desc = statement[:60].replace('"', "'").replace("\\", "/")
+            parts.append(f'sql{n};desc="x{count} {desc}";dur={seconds * 1000:.2f}')
+        return ", ".join(parts)
+
+
+# Set per request by metrics.MetricsMiddleware; threadpool workers see the same
+# object through the copied context, so their updates reach the request
+_request_stats: ContextVar = ContextVar("assetblock_query_stats", default=None)
+
+
+def begin_request_stats(endpoint: str = "") -> QueryStats:
+    stats = QueryStats(endpoint)
+    _request_stats.set(stats)
+    return stats
+
+
+def _explain(conn, query, params) -> str:
+    try:
+        with conn.cursor() as cur:
+            cur.execute(b"EXPLAIN " + cur.mogrify(query, params))
+            return "\n".join(row[0] for row in cur.fetchall())
+    except psycopg2.Error as e:
+        return f"(EXPLAIN failed: {e})"
+
+
+def _record_query(cur, query, params, seconds: float, failed: bool):
+    metrics.DB_QUERIES.inc()
+    metrics.DB_QUERY_SECONDS.observe(seconds)
+    if not failed:
+        statement_timeout.observe(seconds)
+    stats = _request_stats.get()
+    statement = fingerprint(query)
+    if stats is not None:
+        stats.add(statement, seconds)
+    if SLOW_QUERY_MS and seconds * 1000 >= SLOW_QUERY_MS:
+        endpoint = stats.endpoint if stats is not None else "-"
+        plan = _explain(cur.connection, query, params) if SLOW_QUERY_EXPLAIN and not failed else None
+        slow_log.warning(
+            "slow query %.1f ms rows=%s endpoint=%s sql=%s%s",
+            seconds * 1000, cur.rowcount, endpoint, statement, f"\n{plan}" if plan else "",
+        )
+
+
+# ── Circuit breaker and adaptive timeouts ────────────────────────────────────
+# Consecutive connect failures / lost connections that open the breaker
+BREAKER_FAILURES = int(os.getenv("ASSETBLOCK_DB_BREAKER_FAILURES", "5"))
+# Seconds the breaker stays open before a single probe call is let through
+BREAKER_COOLDOWN = float(os.getenv("ASSETBLOCK_DB_BREAKER_COOLDOWN", "10"))
+CONNECT_TIMEOUT = int(os.getenv("ASSETBLOCK_DB_CONNECT_TIMEOUT", "5"))
+# API statements are cancelled after TIMEOUT_FACTOR x the recent p99, within
+# these bounds (TIMEOUT_MAX_MS=0 disables); CLI and bulk jobs are never limited
+TIMEOUT_MIN_MS = int(os.getenv("ASSETBLOCK_DB_TIMEOUT_MIN_MS", "5000"))
+TIMEOUT_MAX_MS = int(os.getenv("ASSETBLOCK_DB_TIMEOUT_MAX_MS", "30000"))
+TIMEOUT_FACTOR = 4
+TIMEOUT_WINDOW = 512
+TIMEOUT_RECOMPUTE_EVERY = 64
+
+
+class DatabaseUnavailable(psycopg2.OperationalError):
+    """Postgres is unreachable, timing out, or the breaker is open; retry after `retry_after` s."""
+
+    def __init__(self, message: str, retry_after: float = BREAKER_COOLDOWN):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Errors from a server that is answering: lock_not_available, and query_canceled,
+# which is how our own statement_timeout surfaces for one slow but legitimate query
+_ANSWERING_PGCODES = {"55P03", "57014"}
+
+
+def _is_unavailable(e: Exception) -> bool:
+    """Connection lost or refused. Deadlocks, lock waits, statement timeouts and
+    bad SQL come from a server that is answering, so they do not count."""
+    return (
+        isinstance(e, psycopg2.OperationalError)
+        and not isinstance(e, psycopg2.extensions.TransactionRollbackError)
+        and getattr(e, "pgcode", None) not in _ANSWERING_PGCODES
     )
 
 
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive unavailability errors. After
+    `cooldown` seconds one probe call is let through (half-open); its outcome
+    closes the breaker or opens it again. While open, before() raises at once,
+    so retries do not pile onto a recovering database.
+    """
+
+    def __init__(self, failures: int, cooldown: float):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+
+    def before(self):
+        if self.state == "closed":
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now - self._opened_at >= self.cooldown:
+                self.state, self._probe_at = "half-open", now
+                return
+            if self.state == "half-open" and now - self._probe_at >= self.cooldown:
+                self._probe_at = now  # the previous probe never reported back
+                return
+            retry_after = max(self.cooldown - (now - self._opened_at), 1.0)
+        metrics.DB_BREAKER_REJECTED.inc()
+        raise DatabaseUnavailable("database unavailable (circuit breaker open)", retry_after)
+
+    def success(self):
+        if self.state == "closed" and not self._consecutive:
+            return
+        with self._lock:
+            if self.state != "closed":
+                log.warning("database reachable again; circuit breaker closed")
+            self.state, self._consecutive = "closed", 0
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self.state == "half-open" or (self.state == "closed" and self._consecutive >= self.failures):
+                self.state, self._opened_at = "open", time.monotonic()
+                log.warning("database unavailable; circuit breaker open for %.0f s", self.cooldown)
+
+
+class AdaptiveTimeout:
+    """statement_timeout that follows TIMEOUT_FACTOR x the p99 of recent successful statements."""
+
+    def __init__(self, floor_ms: int, ceiling_ms: int):
+        self.floor_ms = floor_ms
+        self.ceiling_ms = ceiling_ms
+        self.current_ms = ceiling_ms
+        self._recent = deque(maxlen=TIMEOUT_WINDOW)
+        self._seen = 0
+
+    def observe(self, seconds: float):
+        self._recent.append(seconds)
+        self._seen += 1
+        if self._seen % TIMEOUT_RECOMPUTE_EVERY == 0:
+            ordered = sorted(self._recent)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            self.current_ms = int(min(max(p99 * 1000 * TIMEOUT_FACTOR, self.floor_ms), self.ceiling_ms))
+
+
+breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_COOLDOWN)
+statement_timeout = AdaptiveTimeout(TIMEOUT_MIN_MS, TIMEOUT_MAX_MS)
+metrics.DB_BREAKER_OPEN.callback = lambda: int(breaker.state != "closed")
+metrics.DB_STATEMENT_TIMEOUT_MS.callback = lambda: statement_timeout.current_ms if TIMEOUT_MAX_MS else 0
+
+
+class TimedCursor(psycopg2.extras.RealDictCursor):
+    """RealDictCursor that records every statement's duration and reports
+    its outcome to the circuit breaker."""
+
+    def execute(self, query, vars=None):
+        start, failed = time.perf_counter(), True
+        try:
+            result = super().execute(query, vars)
+            failed = False
+            breaker.success()
+            return result
+        except psycopg2.OperationalError as e:
+            if not _is_unavailable(e) or isinstance(e, DatabaseUnavailable):
+                raise
+            breaker.failure()
+            raise DatabaseUnavailable(f"database unavailable: {e}".strip()) from e
+        finally:
+            _record_query(self, query, vars, time.perf_counter() - start, failed)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            result = super().executemany(query, vars_list)
+            breaker.success()
+            return result
+        except psycopg2.OperationalError as e:
+            if not _is_unavailable(e) or isinstance(e, DatabaseUnavailable):
+                raise
+            breaker.failure()
+            raise DatabaseUnavailable(f"database unavailable: {e}".strip()) from e
+        finally:
+            # Plans for batched statements are not captured (no single parameter set)
+            _record_query(self, query, None, time.perf_counter() - start, True)
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Connection that keeps the open-connection gauge accurate, including
+    connections the server dropped."""
+
+    counted = False
+
+    def close(self):
+        if self.counted:
+            self.counted = False
+            metrics.DB_CONNECTIONS_OPEN.dec()
+        super().close()
+
+    def rollback(self):
+        # After a dropped connection, keep the original error rather than "connection already closed"
+        if not self.closed:
+            super().rollback()
+
+
+# ── Connections ──────────────────────────────────────────────────────────────
+def get_connection():
+    breaker.before()
+    options = {"connect_timeout": CONNECT_TIMEOUT, "connection_factory": TimedConnection}
+    if TIMEOUT_MAX_MS and _request_stats.get() is not None:
+        # Sent in the startup packet, so it costs no extra round trip
+        options["options"] = f"-c statement_timeout={statement_timeout.current_ms}"
+    try:
+        # Prefer DATABASE_URL if provided (Supabase, Render, etc.)
+        database_url = os.getenv("DATABASE_URL")
+        if database_url:
+            conn = psycopg2.connect(database_url, sslmode="require", **options)
+        else:
+            # Fallback to individual env vars (local dev)
+            conn = psycopg2.connect(
+                user=os.getenv("POSTGRE_USER", "postgres"),
+                password=os.getenv("POSTGRE_PASSWORD", ""),
+                host=os.getenv("POSTGRE_HOST", "localhost"),
+                port=os.getenv("POSTGRE_PORT", "5432"),
+                database=os.getenv("POSTGRE_DB", "assetblock"),
+                **options,
+            )
+    except psycopg2.OperationalError as e:
+        breaker.failure()
+        raise DatabaseUnavailable(f"could not connect to the database: {e}".strip()) from e
+    conn.counted = True
+    metrics.DB_CONNECTIONS_OPENED.inc()
+    metrics.DB_CONNECTIONS_OPEN.inc()
+    return conn
+
+
 def execute_query(query: str, params=None, fetch=False):
     conn = get_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur = conn.cursor(cursor_factory=TimedCursor)
     try:
         cur.execute(query, params)
         if fetch:
-            result = cur.fetchall()
-            return [dict(row) for row in result]
+            # Commit too, so UPDATE/DELETE ... RETURNING rows are not rolled back
+            result = [dict(row) for row in cur.fetchall()]
+            conn.commit()
+            return result
         conn.commit()
         return True
     except Exception as e:
@@ -50,7 +338,7 @@ def execute_query(query: str, params=None, fetch=False):
 
 def execute_one(query: str, params=None):
     conn = get_connection()
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    cur = conn.cursor(cursor_factory=TimedCursor)
     try:
         cur.execute(query, params)
         result = cur.fetchone()
@@ -62,3 +350,67 @@ def execute_one(query: str, params=None):
     finally:
         cur.close()
         conn.close()
+
+
+def execute_read_batch(queries) -> list:
+    """Run several (query, params) reads on one connection; returns a list of row lists."""
+    conn = get_connection()
+    cur = conn.cursor(cursor_factory=TimedCursor)
+    try:
+        results = []
+        for query, params in queries:
+            cur.execute(query, params)
+            results.append([dict(row) for row in cur.fetchall()])
+        conn.commit()
+        return results
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cur.close()
+        conn.close()
+
+
+@contextmanager
+def transaction():
+    """Yield a cursor whose statements commit together, or roll back on any error."""
+    conn = get_connection()
+    cur = conn.cursor(cursor_factory=TimedCursor)
+    try:
+        yield cur
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cur.close()
+        conn.close()
+
+
+def stream_query(query: str, params=None, itersize: int = 5000):
+    """Yield rows from a server-side cursor, `itersize` at a time, for scans too big for fetchall."""
+    conn = get_connection()
+    cur = conn.cursor(name="assetblock_stream", cursor_factory=TimedCursor)
+    cur.itersize = itersize
+    try:
+        cur.execute(query, params)
+        for row in cur:
+            yield dict(row)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_table_versions(*tables: str) -> dict:
+    """Return {table: change counter} from table_versions (0 if never written)."""
+    rows = execute_query(
+        "SELECT table_name, version FROM table_versions WHERE table_name = ANY(%s)",
+        (list(tables),),
+        fetch=True,
+    )
+    versions = {row["table_name"]: row["version"] for row in rows}
+    return {table: versions.get(table, 0) for table in tables}
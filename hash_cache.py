@@ -0,0 +1,153 @@
+"""
+hash_cache.py — Persistent local cache of file SHA-256 digests.
+A file whose (path, size, mtime, inode) is unchanged since it was last hashed
+is answered from SQLite after a single stat() instead of a full read.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from sha256_hash import HashResult, hash_file, hash_many
+
+DEFAULT_CACHE_PATH = Path.home() / ".assetblock" / "hash_cache.sqlite3"
+DEFAULT_MAX_ENTRIES = 2_000_000
+# Files modified this recently may still change within the same mtime tick,
+# so their digests are returned but not cached
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class HashCache:
+    """
+    SQLite-backed digest cache with an LRU size limit.
+    With verify=True, hits are re-hashed and any mismatch is corrected and
+    recorded in `mismatches` (useful to audit a cache before trusting it).
+    """
+
+    def __init__(self, db_path=None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        db_path = Path(db_path or os.getenv("ASSETBLOCK_HASH_CACHE") or DEFAULT_CACHE_PATH)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.mismatches = []
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = []
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path        TEXT PRIMARY KEY,
+                size        INTEGER NOT NULL,
+                mtime_ns    INTEGER NOT NULL,
+                inode       INTEGER NOT NULL,
+                digest      TEXT NOT NULL,
+                last_used   INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS file_hashes_last_used ON file_hashes (last_used)")
+        self._conn.commit()
+
+    # ── lookups ──────────────────────────────────────────────────────────────
+    def lookup(self, path: str, st: os.stat_result) -> Optional[str]:
+        """Cached digest if the file still matches its recorded stat, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, digest FROM file_hashes WHERE path = ?", (path,)
+            ).fetchone()
+            if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+                self._touched.append((time.time_ns(), path))
+                self.hits += 1
+                return row[3]
+            self.misses += 1
+            return None
+
+    def store(self, path: str, st: os.stat_result, digest: str):
+        if time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS:
+            return
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO file_hashes (path, size, mtime_ns, inode, digest, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET size = excluded.size, mtime_ns = excluded.mtime_ns,
+                    inode = excluded.inode, digest = excluded.digest, last_used = excluded.last_used
+                """,
+                (path, st.st_size, st.st_mtime_ns, st.st_ino, digest, time.time_ns()),
+            )
+
+    def hash_file(self, path, verify: bool = False, **kwargs) -> str:
+        """sha256_hash.hash_file() behind the cache."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        cached = self.lookup(path, st)
+        if cached and not verify:
+            return cached
+        digest = hash_file(path, **kwargs)
+        self._check(path, cached, digest)
+        self.store(path, st, digest)
+        return digest
+
+    def hash_many(self, paths: Iterable, verify: bool = False, **kwargs) -> Iterator[HashResult]:
+        """
+        sha256_hash.hash_many() behind the cache: hits are yielded straight
+        away, only misses (or everything, with verify) go to the worker pool.
+        """
+        stats, cached = {}, {}
+        misses = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                yield HashResult(path, 0, None, str(e))
+                continue
+            digest = self.lookup(path, st)
+            if digest and not verify:
+                yield HashResult(path, st.st_size, digest)
+                continue
+            stats[path], cached[path] = st, digest
+            misses.append(path)
+
+        for result in hash_many(misses, **kwargs):
+            if result.digest:
+                self._check(result.path, cached.get(result.path), result.digest)
+                self.store(result.path, stats[result.path], result.digest)
+            yield result
+        self.flush()
+
+    def _check(self, path: str, cached: Optional[str], digest: str):
+        if cached and cached != digest:
+            self.mismatches.append(path)
+
+    # ── maintenance ──────────────────────────────────────────────────────────
+    def flush(self):
+        """Write batched LRU touches, evict past max_entries and commit."""
+        with self._lock:
+            if self._touched:
+                self._conn.executemany("UPDATE file_hashes SET last_used = ? WHERE path = ?", self._touched)
+                self._touched.clear()
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM file_hashes").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    """
+                    DELETE FROM file_hashes WHERE path IN (
+                        SELECT path FROM file_hashes ORDER BY last_used LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,233 @@
+"""
+idempotency.py — Idempotency-Key support for AssetBlock POST endpoints.
+The first request with a key claims it (a pending row in idempotency_keys),
+runs normally, and its response is stored for IDEMPOTENCY_TTL_HOURS. A retry
+with the same key gets that stored response back (Idempotent-Replayed: true)
+after one lookup instead of re-hashing an upload or re-running a transfer.
+Recently completed keys are also held in a small in-memory LRU.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+from database import DatabaseUnavailable, execute_one, execute_query
+from sha256_hash import hash_string
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("ASSETBLOCK_IDEMPOTENCY_TTL_HOURS", "24"))
+# A pending claim older than this is treated as abandoned (worker died mid-request)
+PENDING_TIMEOUT = timedelta(minutes=5)
+FRONT_CACHE_SIZE = 1024
+MAX_KEY_LENGTH = 255
+PURGE_EVERY = 500
+
+CACHE_HITS = metrics.CACHE_LOOKUPS.labels("idempotency", "hit")
+CACHE_MISSES = metrics.CACHE_LOOKUPS.labels("idempotency", "miss")
+
+log = logging.getLogger("assetblock.idempotency")
+
+
+class _FrontCache:
+    """Thread-safe LRU of completed responses: storage key -> (fingerprint, status, headers, body, expires_at)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[4] <= datetime.now():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item
+
+    def put(self, key: str, item: tuple):
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+_front = _FrontCache(FRONT_CACHE_SIZE)
+_claims = 0
+
+
+# ── Storage ───────────────────────────────────────────────────────────────────
+def _claim(key: str, method: str, path: str, fingerprint: str):
+    """Claim the key; returns None if we own it now, else the existing row."""
+    global _claims
+    _claims += 1
+    if _claims % PURGE_EVERY == 0:
+        execute_query("DELETE FROM idempotency_keys WHERE expires_at < %s", (datetime.now(),))
+    now = datetime.now()
+    claimed = execute_one(
+        """
+        INSERT INTO idempotency_keys (key, method, path, fingerprint, created_at, expires_at)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (key) DO UPDATE
+            SET fingerprint = EXCLUDED.fingerprint, status_code = NULL, response_headers = NULL,
+                response_body = NULL, created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+            WHERE idempotency_keys.expires_at < %s
+               OR (idempotency_keys.status_code IS NULL AND idempotency_keys.created_at < %s)
+        RETURNING key
+        """,
+        (key, method, path, fingerprint, now, now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+         now, now - PENDING_TIMEOUT),
+    )
+    if claimed:
+        return None
+    return execute_one(
+        "SELECT fingerprint, status_code, response_headers, response_body, expires_at "
+        "FROM idempotency_keys WHERE key = %s",
+        (key,),
+    )
+
+
+def _complete(key: str, status: int, headers: list, body: bytes):
+    execute_query(
+        "UPDATE idempotency_keys SET status_code = %s, response_headers = %s, response_body = %s WHERE key = %s",
+        (status, json.dumps(headers), body, key),
+    )
+
+
+def _release_quietly(key: str):
+    try:
+        execute_query("DELETE FROM idempotency_keys WHERE key = %s AND status_code IS NULL", (key,))
+    except DatabaseUnavailable:
+        pass  # the pending claim lapses after PENDING_TIMEOUT instead
+
+
+# ── ASGI middleware ───────────────────────────────────────────────────────────
+def _caller(scope, headers: dict) -> str:
+    uid = headers.get(b"x-assetblock-uid", b"").decode("latin-1").strip()
+    ip = (scope.get("client") or ("", 0))[0]
+    return f"{uid}@{ip}"
+
+
+def _fingerprint(headers: dict) -> str:
+    """
+    Media type plus the client's Idempotency-Payload-Digest when sent. Multipart
+    bodies are otherwise not compared at all: clients pick a new boundary on
+    every attempt, which changes both Content-Type and Content-Length.
+    """
+    content_type = headers.get(b"content-type", b"").decode("latin-1")
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    digest = headers.get(b"idempotency-payload-digest", b"").decode("latin-1").strip()
+    if not digest and not media_type.startswith("multipart/"):
+        digest = headers.get(b"content-length", b"").decode("latin-1")
+    return hash_string(f"{media_type}|{digest}")
+
+
+async def _send_json(send, status: int, detail: str, extra_headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *extra_headers]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, status: int, headers: list, body: bytes):
+    raw = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+    raw.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": status, "headers": raw})
+    await send({"type": "http.response.body", "body": bytes(body)})
+
+
+class IdempotencyMiddleware:
+    """
+    Applies to POST requests that carry an Idempotency-Key header; all others
+    pass straight through. Keys are scoped to method, path and caller (the
+    X-AssetBlock-Uid a portal sends, plus the client address), so callers
+    never see each other's responses. Reusing a key for a different request
+    is rejected with 422 (see _fingerprint). While the first request is still
+    running, a retry gets 409 with Retry-After; the endpoints' own 409s never
+    carry one. Responses with status >= 500 are not stored, so they can be retried.
+    """
+
+    def __init__(self, app, methods=("POST",)):
+        self.app = app
+        self.methods = set(methods)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        client_key = headers.get(b"idempotency-key", b"").decode("latin-1").strip()
+        if not client_key:
+            await self.app(scope, receive, send)
+            return
+        if len(client_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+            return
+
+        key = hash_string(f"{scope['method']} {scope['path']}|{_caller(scope, headers)}|{client_key}")
+        fingerprint = _fingerprint(headers)
+
+        cached = _front.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            CACHE_HITS.inc()
+            await _replay(send, *cached[1:4])
+            return
+        CACHE_MISSES.inc()
+
+        try:
+            existing = await run_in_threadpool(_claim, key, scope["method"], scope["path"], fingerprint)
+        except DatabaseUnavailable as e:
+            # Nothing ran yet, so the client can safely retry with the same key
+            await _send_json(send, 503, "Database temporarily unavailable, please retry shortly",
+                             [(b"retry-after", str(math.ceil(e.retry_after)).encode())])
+            return
+        if existing is not None:
+            if existing["fingerprint"] != fingerprint:
+                await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            elif existing["status_code"] is None:
+                await _send_json(send, 409, "A request with this Idempotency-Key is still in progress",
+                                 [(b"retry-after", b"1")])
+            else:
+                stored = json.loads(existing["response_headers"])
+                _front.put(key, (fingerprint, existing["status_code"], stored, bytes(existing["response_body"]),
+                                 existing["expires_at"]))
+                await _replay(send, existing["status_code"], stored, existing["response_body"])
+            return
+
+        # We own the key: run the request, forwarding the response while keeping a copy
+        status, response_headers, chunks = 500, [], []
+
+        async def capture(message):
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await run_in_threadpool(_release_quietly, key)
+            raise
+        if status >= 500:
+            await run_in_threadpool(_release_quietly, key)
+            return
+        body = b"".join(chunks)
+        try:
+            await run_in_threadpool(_complete, key, status, response_headers, body)
+        except DatabaseUnavailable:
+            # The pending row expires after PENDING_TIMEOUT; until then this worker still replays
+            log.warning("could not store idempotent response for %s %s", scope["method"], scope["path"])
+        _front.put(key, (fingerprint, status, response_headers, body,
+                         datetime.now() + timedelta(hours=IDEMPOTENCY_TTL_HOURS)))
@@ -0,0 +1,263 @@
+"""
+ledger.py — Hash-chained, tamper-evident transfer ledger for AssetBlock.
+Every transfer_history row carries two links:
+  prev_hash        entry_hash of the previous transfer (global chain)
+  asset_prev_hash  entry_hash of the previous transfer of the same asset
+and entry_hash = hash_string(canonical record | prev_hash | asset_prev_hash).
+Editing, inserting or deleting any row breaks every hash after it.
+Verification resumes from the last ledger_checkpoints row, so an audit only
+re-hashes entries appended since. Publish checkpoint hashes externally to
+anchor them beyond the database itself.
+Run: python ledger.py --seal     (chain rows written before the ledger existed)
+     python ledger.py --verify [--full]
+"""
+
+import io
+import json
+from datetime import datetime
+
+from database import TimedCursor, execute_one, execute_query, stream_query, transaction
+from sha256_hash import hash_string
+
+GENESIS = "0" * 64
+# pg_advisory_xact_lock key serialising appends to the global chain
+LEDGER_LOCK_KEY = 0x41424C47
+SEAL_BATCH = 50_000
+
+
+def canonical_record(row: dict) -> str:
+    """Stable JSON of the fields an entry commits to."""
+    transferred_at = row["transferred_at"]
+    if isinstance(transferred_at, datetime):
+        transferred_at = transferred_at.isoformat()
+    return json.dumps(
+        {
+            "asset_id": row["asset_id"],
+            "from_uid": row["from_uid"] or "",
+            "to_uid": row["to_uid"] or "",
+            "from_email": row["from_email"] or "",
+            "to_email": row["to_email"] or "",
+            "note": row["note"] or "",
+            "transferred_at": transferred_at,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+
+
+def entry_hash(row: dict, prev_hash: str, asset_prev_hash: str) -> str:
+    return hash_string(f"{canonical_record(row)}|{prev_hash}|{asset_prev_hash}")
+
+
+def _heads(cur, asset_id: int) -> tuple:
+    """(global head, asset head) entry hashes; caller must hold the ledger lock."""
+    cur.execute(
+        "SELECT id, entry_hash FROM transfer_history WHERE entry_hash IS NOT NULL ORDER BY id DESC LIMIT 1"
+    )
+    head = cur.fetchone()
+    cur.execute(
+        """
+        SELECT entry_hash FROM transfer_history
+        WHERE asset_id = %s AND entry_hash IS NOT NULL
+        ORDER BY id DESC LIMIT 1
+        """,
+        (asset_id,),
+    )
+    asset_head = cur.fetchone()
+    return (head["entry_hash"] if head else GENESIS), (asset_head["entry_hash"] if asset_head else GENESIS)
+
+
+def _seal_pending(cur) -> int:
+    """
+    Chain unhashed rows that sit after the current head (legacy or bulk-loaded
+    data). Rows stream through a server-side cursor and their hashes go back
+    via COPY plus one UPDATE per batch, so millions of rows seal in one pass.
+    """
+    cur.execute(
+        "SELECT id, entry_hash FROM transfer_history WHERE entry_hash IS NOT NULL ORDER BY id DESC LIMIT 1"
+    )
+    head = cur.fetchone()
+    head_id, prev_hash = (head["id"], head["entry_hash"]) if head else (0, GENESIS)
+    cur.execute(
+        """
+        SELECT DISTINCT ON (asset_id) asset_id, entry_hash FROM transfer_history
+        WHERE entry_hash IS NOT NULL AND asset_id IN (
+            SELECT DISTINCT asset_id FROM transfer_history WHERE entry_hash IS NULL AND id > %s
+        )
+        ORDER BY asset_id, id DESC
+        """,
+        (head_id,),
+    )
+    asset_heads = {row["asset_id"]: row["entry_hash"] for row in cur.fetchall()}
+    cur.execute(
+        """
+        CREATE TEMP TABLE IF NOT EXISTS ledger_seal (
+            id INTEGER PRIMARY KEY, prev_hash VARCHAR(64), asset_prev_hash VARCHAR(64), entry_hash VARCHAR(64)
+        ) ON COMMIT DROP
+        """
+    )
+
+    # The cursor reads a snapshot taken when it opens, so the UPDATEs below don't disturb it
+    pending = cur.connection.cursor(name="assetblock_seal", cursor_factory=TimedCursor)
+    pending.execute(
+        "SELECT * FROM transfer_history WHERE entry_hash IS NULL AND id > %s ORDER BY id", (head_id,)
+    )
+    sealed = 0
+    while rows := pending.fetchmany(SEAL_BATCH):
+        buffer = io.StringIO()
+        for row in rows:
+            asset_id = row["asset_id"]
+            links = (prev_hash, asset_heads.get(asset_id, GENESIS))
+            prev_hash = asset_heads[asset_id] = entry_hash(row, *links)
+            buffer.write(f"{row['id']}\t{links[0]}\t{links[1]}\t{prev_hash}\n")
+        buffer.seek(0)
+        cur.execute("TRUNCATE ledger_seal")
+        cur.copy_expert("COPY ledger_seal FROM STDIN", buffer)
+        cur.execute(
+            """
+            UPDATE transfer_history t
+            SET prev_hash = s.prev_hash, asset_prev_hash = s.asset_prev_hash, entry_hash = s.entry_hash
+            FROM ledger_seal s WHERE t.id = s.id
+            """
+        )
+        sealed += len(rows)
+    pending.close()
+    return sealed
+
+
+def append_transfer(cur, asset_id: int, from_uid: str, to_uid: str,
+                    from_email: str, to_email: str, note: str = "") -> dict:
+    """
+    Insert a chained transfer_history row using the caller's transaction cursor.
+    The advisory lock is held until that transaction ends, so concurrent
+    transfers append one after another.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (LEDGER_LOCK_KEY,))
+    cur.execute("SELECT 1 FROM transfer_history WHERE entry_hash IS NULL LIMIT 1")
+    if cur.fetchone():
+        _seal_pending(cur)
+    row = {
+        "asset_id": asset_id,
+        "from_uid": from_uid,
+        "to_uid": to_uid,
+        "from_email": from_email,
+        "to_email": to_email,
+        "note": note or "",
+        "transferred_at": datetime.now(),
+    }
+    prev_hash, asset_prev_hash = _heads(cur, asset_id)
+    cur.execute(
+        """
+        INSERT INTO transfer_history (asset_id, from_uid, to_uid, from_email, to_email, note,
+                                      transferred_at, prev_hash, asset_prev_hash, entry_hash)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        RETURNING *
+        """,
+        (*row.values(), prev_hash, asset_prev_hash, entry_hash(row, prev_hash, asset_prev_hash)),
+    )
+    return cur.fetchone()
+
+
+def seal() -> int:
+    """Chain rows written without hashes. Returns how many were sealed."""
+    with transaction() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (LEDGER_LOCK_KEY,))
+        return _seal_pending(cur)
+
+
+# ── Verification ──────────────────────────────────────────────────────────────
+def _asset_heads_before(before_id: int) -> dict:
+    """Each asset's last sealed entry hash up to before_id, for assets with entries after it."""
+    rows = execute_query(
+        """
+        SELECT DISTINCT ON (asset_id) asset_id, entry_hash FROM transfer_history
+        WHERE id <= %s AND entry_hash IS NOT NULL AND asset_id IN (
+            SELECT DISTINCT asset_id FROM transfer_history WHERE id > %s AND entry_hash IS NOT NULL
+        )
+        ORDER BY asset_id, id DESC
+        """,
+        (before_id, before_id),
+        fetch=True,
+    )
+    return {row["asset_id"]: row["entry_hash"] for row in rows}
+
+
+def verify_ledger(full: bool = False) -> dict:
+    """
+    Re-hash the global chain from the last checkpoint (or from genesis with
+    full=True). On success a new checkpoint is recorded at the head.
+    """
+    checkpoint = None if full else execute_one(
+        "SELECT last_entry_id, entry_hash FROM ledger_checkpoints ORDER BY id DESC LIMIT 1"
+    )
+    start_id, prev_hash = (checkpoint["last_entry_id"], checkpoint["entry_hash"]) if checkpoint else (0, GENESIS)
+
+    if checkpoint:
+        anchor = execute_one("SELECT entry_hash FROM transfer_history WHERE id = %s", (start_id,))
+        if not anchor or anchor["entry_hash"] != prev_hash:
+            return {"ok": False, "verified": 0, "from_id": start_id, "first_bad_id": start_id,
+                    "reason": "checkpointed entry was modified or removed"}
+
+    # One query for every asset's head at the checkpoint, not one per asset
+    asset_heads = _asset_heads_before(start_id) if start_id else {}
+    verified, last_id = 0, start_id
+    for row in stream_query(
+        "SELECT * FROM transfer_history WHERE id > %s AND entry_hash IS NOT NULL ORDER BY id",
+        (start_id,),
+    ):
+        asset_id = row["asset_id"]
+        expected_links = (prev_hash, asset_heads.get(asset_id, GENESIS))
+        if (row["prev_hash"], row["asset_prev_hash"]) != expected_links:
+            return {"ok": False, "verified": verified, "from_id": start_id, "first_bad_id": row["id"],
+                    "reason": "broken link to previous entry"}
+        if entry_hash(row, *expected_links) != row["entry_hash"]:
+            return {"ok": False, "verified": verified, "from_id": start_id, "first_bad_id": row["id"],
+                    "reason": "entry contents do not match entry_hash"}
+        prev_hash = asset_heads[asset_id] = row["entry_hash"]
+        last_id = row["id"]
+        verified += 1
+
+    if verified:
+        execute_query(
+            "INSERT INTO ledger_checkpoints (last_entry_id, entry_hash, entries_verified) VALUES (%s, %s, %s)",
+            (last_id, prev_hash, verified),
+        )
+    unsealed = execute_one("SELECT COUNT(*) AS count FROM transfer_history WHERE entry_hash IS NULL")
+    return {
+        "ok": True,
+        "verified": verified,
+        "from_id": start_id,
+        "head_id": last_id,
+        "head_hash": prev_hash,
+        "unsealed": unsealed["count"] if unsealed else 0,
+    }
+
+
+def verify_asset_chain(asset_id: int) -> dict:
+    """Re-hash one asset's transfer chain (read-only)."""
+    rows = execute_query(
+        "SELECT * FROM transfer_history WHERE asset_id = %s AND entry_hash IS NOT NULL ORDER BY id",
+        (asset_id,),
+        fetch=True,
+    )
+    asset_prev_hash = GENESIS
+    for verified, row in enumerate(rows):
+        if row["asset_prev_hash"] != asset_prev_hash or \
+                entry_hash(row, row["prev_hash"], asset_prev_hash) != row["entry_hash"]:
+            return {"ok": False, "asset_id": asset_id, "verified": verified, "first_bad_id": row["id"]}
+        asset_prev_hash = row["entry_hash"]
+    return {"ok": True, "asset_id": asset_id, "verified": len(rows), "head_hash": asset_prev_hash}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AssetBlock transfer ledger maintenance")
+    parser.add_argument("--seal", action="store_true", help="chain rows written without hashes")
+    parser.add_argument("--verify", action="store_true", help="verify from the last checkpoint")
+    parser.add_argument("--full", action="store_true", help="with --verify, start from genesis")
+    args = parser.parse_args()
+    if args.seal:
+        print(f"🔗 Sealed {seal()} transfer(s).")
+    if args.verify:
+        print(json.dumps(verify_ledger(full=args.full), indent=2, default=str))
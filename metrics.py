@@ -0,0 +1,283 @@
+"""
+metrics.py — In-process Prometheus metrics for the AssetBlock API.
+Counters, gauges and histograms keep one shard per thread, so the hot path
+is a dict update with no lock; shards are only merged when /metrics is
+scraped. Label sets are bound once with .labels() and reused.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+_registry = []
+
+
+class _Shards:
+    """One values dict per thread; merged under a lock only at scrape time."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._all.append(values)
+            return values
+
+    def snapshot(self) -> list:
+        with self._lock:
+            shards = list(self._all)
+        return [list(shard.items()) for shard in shards]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards()
+        self._children = {}
+        _registry.append(self)
+
+    def labels(self, *values):
+        """Bound child for one label set (cached, so callers can keep it)."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._child(key))
+        return child
+
+    def _child(self, key: tuple):
+        raise NotImplementedError
+
+    def render(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _BoundCounter:
+    __slots__ = ("_shards", "_key")
+
+    def __init__(self, shards: _Shards, key: tuple):
+        self._shards, self._key = shards, key
+
+    def inc(self, amount: float = 1):
+        values = self._shards.mine()
+        values[self._key] = values.get(self._key, 0) + amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self, key):
+        return _BoundCounter(self._shards, key)
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def totals(self) -> dict:
+        merged = {}
+        for shard in self._shards.snapshot():
+            for key, value in shard:
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def render(self):
+        lines = super().render()
+        for key, value in sorted(self.totals().items()):
+            lines.append(f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Sum of per-thread deltas (inc/dec), or a callback read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def dec(self, amount: float = 1):
+        self.labels().inc(-amount)
+
+    def totals(self):
+        return {(): self.callback()} if self.callback else super().totals()
+
+
+class _BoundHistogram:
+    __slots__ = ("_shards", "_key", "_bounds")
+
+    def __init__(self, shards: _Shards, key: tuple, bounds: tuple):
+        self._shards, self._key, self._bounds = shards, key, bounds
+
+    def observe(self, value: float):
+        values = self._shards.mine()
+        cells = values.get(self._key)
+        if cells is None:
+            # one slot per bucket, +Inf, then sum and count
+            cells = values[self._key] = [0] * (len(self._bounds) + 3)
+        cells[bisect_left(self._bounds, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _child(self, key):
+        return _BoundHistogram(self._shards, key, self.bounds)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = super().render()
+        merged = {}
+        for shard in self._shards.snapshot():
+            for key, cells in shard:
+                total = merged.setdefault(key, [0] * len(cells))
+                for i, cell in enumerate(list(cells)):
+                    total[i] += cell
+        for key, cells in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + ("+Inf",), cells[:-2]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(cells[-2])}")
+            lines.append(f"{self.name}_count{labels} {cells[-1]}")
+        return lines
+
+
+def render_all() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# ── AssetBlock metrics ────────────────────────────────────────────────────────
+REQUESTS = Counter(
+    "assetblock_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+REQUEST_SECONDS = Histogram(
+    "assetblock_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route")
+)
+IN_FLIGHT = Gauge("assetblock_http_requests_in_flight", "HTTP requests currently being served.")
+
+HASHED_BYTES = Counter("assetblock_hashed_bytes_total", "Bytes run through SHA-256 by the API.", ("source",))
+HASH_SECONDS = Counter("assetblock_hash_seconds_total", "Time spent hashing those bytes.", ("source",))
+
+DB_QUERIES = Counter("assetblock_db_queries_total", "SQL statements executed.")
+DB_QUERY_SECONDS = Histogram("assetblock_db_query_duration_seconds", "SQL statement latency.")
+DB_QUERIES_PER_REQUEST = Histogram(
+    "assetblock_db_queries_per_request", "SQL statements per HTTP request.", ("route",), QUERY_COUNT_BUCKETS
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "assetblock_db_seconds_per_request", "Time in SQL per HTTP request.", ("route",)
+)
+DB_CONNECTIONS_OPENED = Counter(
+    "assetblock_db_connections_opened_total", "PostgreSQL connections opened (one per helper call, no pool)."
+)
+DB_CONNECTIONS_OPEN = Gauge("assetblock_db_connections_open", "PostgreSQL connections currently open.")
+
+DB_BREAKER_OPEN = Gauge("assetblock_db_breaker_open", "1 while the database circuit breaker is open or probing.")
+DB_BREAKER_REJECTED = Counter(
+    "assetblock_db_breaker_rejected_total", "Database calls failed fast because the breaker was open."
+)
+DB_STATEMENT_TIMEOUT_MS = Gauge("assetblock_db_statement_timeout_ms", "Current adaptive statement_timeout.")
+
+REQUESTS_SHED = Counter(
+    "assetblock_requests_shed_total", "Requests rejected with 429 by admission control.", ("reason",)
+)
+
+CACHE_LOOKUPS = Counter(
+    "assetblock_cache_lookups_total", "Cache lookups by cache and result (hit/miss).", ("cache", "result")
+)
+
+
+# ── ASGI middleware ───────────────────────────────────────────────────────────
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware task hop). Labels use the
+    matched route template, e.g. /assets/{asset_id}, so cardinality stays
+    bounded; unmatched paths share one label. If begin_request returns an
+    object with server_timing(), its value is sent as a Server-Timing header.
+    """
+
+    def __init__(self, app, begin_request=None):
+        self.app = app
+        self.begin_request = begin_request
+        self._bound = {}
+
+    def _series(self, method: str, route: str) -> tuple:
+        series = self._bound.get((method, route))
+        if series is None:
+            series = self._bound[(method, route)] = (
+                REQUEST_SECONDS.labels(method, route),
+                DB_QUERIES_PER_REQUEST.labels(route),
+                DB_SECONDS_PER_REQUEST.labels(route),
+            )
+        return series
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        db = self.begin_request(f"{scope['method']} {scope['path']}") if self.begin_request else None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if db is not None and db.count:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", db.server_timing().encode("latin-1", "replace")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            latency, queries, db_seconds = self._series(method, route)
+            latency.observe(elapsed)
+            REQUESTS.labels(method, route, status).inc()
+            if db is not None:
+                queries.observe(db.count)
+                db_seconds.observe(db.seconds)
@@ -0,0 +1,111 @@
+"""
+profiler.py — Opt-in sampling profiler for live API workers.
+A background thread samples every thread's stack via sys._current_frames()
+for a fixed window and writes flamegraph-compatible collapsed stacks
+("frame;frame;frame count" per line) to ASSETBLOCK_PROFILE_DIR.
+Nothing runs and no hooks are installed until a profile is requested, so
+leaving it wired in costs nothing. Trigger with POST /admin/profile or
+`kill -USR2 <worker pid>`; render with flamegraph.pl or speedscope.
+"""
+
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_SECONDS = 10.0
+DEFAULT_INTERVAL = 0.005
+MAX_SECONDS = 300.0
+MAX_DEPTH = 128
+
+
+def profile_dir() -> Path:
+    return Path(os.getenv("ASSETBLOCK_PROFILE_DIR") or Path(tempfile.gettempdir()) / "assetblock-profiles")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """One profiling window; sample() runs on its own daemon thread."""
+
+    def __init__(self, seconds: float = DEFAULT_SECONDS, interval: float = DEFAULT_INTERVAL):
+        self.seconds = min(max(seconds, 0.1), MAX_SECONDS)
+        self.interval = max(interval, 0.001)
+        self.path = profile_dir() / f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+        self.samples = 0
+        self._stacks = Counter()
+        self._thread = threading.Thread(target=self._run, name="assetblock-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.monotonic() + self.seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                    names.setdefault(ident, str(ident))
+                self._stacks[f"{names[ident]};{_collapse(frame)}"] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+        self._write()
+
+    def _write(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp, self.path)
+
+
+# ── Single active profile per process ─────────────────────────────────────────
+_lock = threading.Lock()
+_active: Optional[SamplingProfiler] = None
+
+
+def start_profile(seconds: float = DEFAULT_SECONDS, interval: float = DEFAULT_INTERVAL) -> Optional[SamplingProfiler]:
+    """Start a window unless one is already running (then returns None)."""
+    global _active
+    with _lock:
+        if _active is not None and _active._thread.is_alive():
+            return None
+        _active = SamplingProfiler(seconds, interval).start()
+        return _active
+
+
+def active_profile() -> Optional[SamplingProfiler]:
+    return _active if _active is not None and _active._thread.is_alive() else None
+
+
+def install_signal_handler(signum: int = getattr(signal, "SIGUSR2", 0), seconds: float = DEFAULT_SECONDS) -> bool:
+    """Profile for `seconds` on `signum`. No-op where the signal or main thread is unavailable."""
+    if not signum:
+        return False
+    try:
+        signal.signal(signum, lambda *_: start_profile(seconds))
+    except ValueError:
+        return False  # not the main thread
+    return True
@@ -0,0 +1,186 @@
+"""
+rate_limit.py — Admission control for the AssetBlock API.
+Each request spends tokens from an in-process token bucket per client IP.
+Requests from trusted IPs (the portal servers, which carry many users behind
+one address) are limited per user instead: by the X-AssetBlock-Uid header
+the portal sets, or the {uid} in /assets/my/{uid} and /activity/{uid}.
+Nothing else can vouch for a uid, so from other addresses it is ignored and
+cannot drain someone else's bucket. The cost depends on the route:
+uploads and file verification pay per MB, searches more than lookups.
+Expensive routes also share a global concurrency cap (requests that will only
+wait on a coalesced leader are exempt, see `exempt`). Anything over a limit
+gets 429 with Retry-After before it touches a worker thread or the database.
+Limits are per worker process.
+"""
+
+import ipaddress
+import json
+import math
+import os
+import re
+import time
+
+import metrics
+
+# "<tokens per second>/<burst>"; 0 disables that bucket
+UID_LIMIT = os.getenv("ASSETBLOCK_RATE_LIMIT_UID", "10/60")
+IP_LIMIT = os.getenv("ASSETBLOCK_RATE_LIMIT_IP", "20/120")
+# Comma-separated IPs / CIDRs limited per user (their X-AssetBlock-Uid) instead of per IP: the portal servers
+TRUSTED = os.getenv("ASSETBLOCK_RATE_LIMIT_TRUSTED", "127.0.0.1,::1")
+# Expensive requests running at once in this worker (0 disables)
+MAX_EXPENSIVE = int(os.getenv("ASSETBLOCK_MAX_EXPENSIVE_CONCURRENCY", "8"))
+BYTES_PER_TOKEN = 1024 * 1024
+PRUNE_EVERY = 1000
+
+# (method, path pattern, base cost, charged per MB of body, expensive) — first match wins
+ROUTE_COSTS = [
+    ("POST", re.compile(r"^/assets/upload$"), 5, True, True),
+    ("POST", re.compile(r"^/assets/verify$"), 3, True, True),
+    ("POST", re.compile(r"^/assets/(verify/batch|exists)$"), 3, False, False),
+    ("POST", re.compile(r"^/ledger/verify$"), 20, False, True),
+    ("GET", re.compile(r"^/assets/search/"), 5, False, True),
+    ("GET", re.compile(r"^/assets/read$"), 3, False, True),
+    ("GET", re.compile(r"^/(stats|admin/overview|activity/admin/all|users)$"), 2, False, False),
+]
+DEFAULT_COST = 1
+UID_PATH = re.compile(r"^/(?:assets/my|activity)/(?!admin/)([^/]+)$")
+
+SHED = {reason: metrics.REQUESTS_SHED.labels(reason) for reason in ("uid", "ip", "concurrency")}
+
+
+def _parse_limit(text: str) -> tuple:
+    rate, _, burst = text.partition("/")
+    rate = float(rate or 0)
+    return rate, float(burst or rate)
+
+
+class TokenBuckets:
+    """Lazily refilled buckets keyed by string; fully refilled buckets are pruned."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._calls = 0
+
+    def take(self, key: str, cost: float) -> float:
+        """Spend `cost` tokens; returns 0 on success, else seconds until it would succeed (nothing spent)."""
+        now = time.monotonic()
+        cost = min(cost, self.burst)  # a single request bigger than the burst drains it, never waits forever
+        tokens, stamp = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+        self._buckets[key] = (tokens - cost, now)
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float):
+        full = self.burst / self.rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < full}
+
+
+def _trusted_networks(text: str) -> list:
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in text.split(",") if item.strip()]
+
+
+def _is_trusted(ip: str, networks: list) -> bool:
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+async def _too_many(send, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# ── ASGI middleware ───────────────────────────────────────────────────────────
+class RateLimitMiddleware:
+    """
+    Checks run on the event loop before the request is routed, so rejected
+    requests cost no thread or connection. The concurrency cap is checked
+    before any tokens are spent, so shed requests use no quota. `exempt(scope)`
+    marks expensive requests that won't do the work themselves (coalesced
+    followers); they still spend tokens but take no concurrency slot. Behind a
+    proxy, run uvicorn with --proxy-headers so the client address is the real one.
+    """
+
+    def __init__(self, app, uid_limit: str = UID_LIMIT, ip_limit: str = IP_LIMIT, trusted: str = TRUSTED,
+                 max_expensive: int = MAX_EXPENSIVE, exempt=None):
+        self.app = app
+        uid_rate, uid_burst = _parse_limit(uid_limit)
+        ip_rate, ip_burst = _parse_limit(ip_limit)
+        self.uid_buckets = TokenBuckets(uid_rate, uid_burst) if uid_rate else None
+        self.ip_buckets = TokenBuckets(ip_rate, ip_burst) if ip_rate else None
+        self.trusted = _trusted_networks(trusted)
+        self.max_expensive = max_expensive
+        self.expensive_in_flight = 0
+        self.exempt = exempt
+
+    @staticmethod
+    def _cost(scope, headers: dict) -> tuple:
+        """(tokens, expensive) for this request."""
+        for method, pattern, base, per_mb, expensive in ROUTE_COSTS:
+            if scope["method"] == method and pattern.match(scope["path"]):
+                cost = base
+                if per_mb:
+                    try:
+                        cost += int(headers.get(b"content-length", b"0")) / BYTES_PER_TOKEN
+                    except ValueError:
+                        pass
+                return cost, expensive
+        return DEFAULT_COST, False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        cost, expensive = self._cost(scope, headers)
+        expensive = expensive and self.max_expensive and not (self.exempt and self.exempt(scope))
+        if expensive and self.expensive_in_flight >= self.max_expensive:
+            SHED["concurrency"].inc()
+            await _too_many(send, "Server is busy, please retry shortly", 1)
+            return
+
+        ip = (scope.get("client") or ("", 0))[0]
+        if ip and _is_trusted(ip, self.trusted):
+            uid = headers.get(b"x-assetblock-uid", b"").decode("latin-1").strip()
+            if not uid:
+                match = UID_PATH.match(scope["path"])
+                uid = match.group(1) if match else ""
+            buckets, key, reason = self.uid_buckets, uid, "uid"
+        else:
+            buckets, key, reason = self.ip_buckets, ip, "ip"
+        if key and buckets is not None:
+            wait = buckets.take(key, cost)
+            if wait:
+                SHED[reason].inc()
+                detail = "this user" if reason == "uid" else "this address"
+                await _too_many(send, f"Too many requests for {detail}, slow down", wait)
+                return
+
+        if not expensive:
+            await self.app(scope, receive, send)
+            return
+        self.expensive_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.expensive_in_flight -= 1
@@ -0,0 +1,176 @@
+"""
+registry_tree.py — Merkle mountain range over every registered asset hash.
+Each upload appends one leaf (merkle_leaf of the raw SHA-256 digest) and
+stores only the O(log n) nodes it completes, so the registry root is
+maintained incrementally and survives restarts without a rebuild.
+Inclusion proofs use the same {"side", "hash"} steps as chunk proofs and
+check with sha256_hash.verify_merkle_proof(leaf_hash, proof, root).
+Leaves are never removed: deleting an asset leaves its hash committed.
+Run: python registry_tree.py --backfill   (assets registered before the tree existed)
+"""
+
+import io
+from typing import Optional
+
+from database import TimedCursor, execute_one, transaction
+from sha256_hash import merkle_leaf, merkle_parent
+
+BACKFILL_BATCH = 50_000
+
+
+def leaf_hash(asset_hash: str) -> str:
+    return merkle_leaf(bytes.fromhex(asset_hash))
+
+
+def peaks_of(leaf_count: int) -> list:
+    """(height, idx) of each perfect subtree in a range of `leaf_count` leaves, left to right."""
+    peaks, covered = [], 0
+    for height in range(leaf_count.bit_length() - 1, -1, -1):
+        if leaf_count & (1 << height):
+            peaks.append((height, covered >> height))
+            covered += 1 << height
+    return peaks
+
+
+def bag_peaks(peak_hashes: list) -> Optional[str]:
+    """Fold peaks right to left into the single registry root."""
+    if not peak_hashes:
+        return None
+    root = peak_hashes[-1]
+    for peak in reversed(peak_hashes[:-1]):
+        root = merkle_parent(peak, root)
+    return root
+
+
+def _fetch_nodes(cur, positions: list) -> dict:
+    if not positions:
+        return {}
+    cur.execute(
+        "SELECT height, idx, hash FROM registry_nodes WHERE (height, idx) IN %s",
+        (tuple(positions),),
+    )
+    return {(row["height"], row["idx"]): row["hash"] for row in cur.fetchall()}
+
+
+# ── Append ────────────────────────────────────────────────────────────────────
+def append_leaf(cur, asset_hash: str) -> tuple:
+    """
+    Append one asset hash inside the caller's transaction; returns
+    (leaf_index, new root). The registry_state row lock serialises appends.
+    """
+    cur.execute("INSERT INTO registry_state (id, leaf_count) VALUES (1, 0) ON CONFLICT (id) DO NOTHING")
+    cur.execute("SELECT leaf_count FROM registry_state WHERE id = 1 FOR UPDATE")
+    leaf_index = cur.fetchone()["leaf_count"]
+
+    # Climb while the new node is a right child, merging with its left sibling
+    height, idx, node = 0, leaf_index, leaf_hash(asset_hash)
+    new_nodes = [(height, idx, node)]
+    while idx & 1:
+        cur.execute("SELECT hash FROM registry_nodes WHERE height = %s AND idx = %s", (height, idx - 1))
+        node = merkle_parent(cur.fetchone()["hash"], node)
+        height, idx = height + 1, idx >> 1
+        new_nodes.append((height, idx, node))
+    cur.executemany("INSERT INTO registry_nodes (height, idx, hash) VALUES (%s, %s, %s)", new_nodes)
+
+    leaf_count = leaf_index + 1
+    peaks = peaks_of(leaf_count)
+    known = _fetch_nodes(cur, peaks[:-1])
+    root = bag_peaks([known[p] for p in peaks[:-1]] + [node])
+    cur.execute(
+        "UPDATE registry_state SET leaf_count = %s, root = %s, updated_at = CURRENT_TIMESTAMP WHERE id = 1",
+        (leaf_count, root),
+    )
+    return leaf_index, root
+
+
+# ── Reads ─────────────────────────────────────────────────────────────────────
+def registry_root() -> dict:
+    state = execute_one("SELECT leaf_count, root, updated_at FROM registry_state WHERE id = 1")
+    return state or {"leaf_count": 0, "root": None, "updated_at": None}
+
+
+def inclusion_proof(leaf_index: int, leaf_count: int) -> list:
+    """Sibling path from leaf `leaf_index` to the root of a registry of `leaf_count` leaves."""
+    if not 0 <= leaf_index < leaf_count:
+        raise ValueError(f"leaf {leaf_index} is outside a registry of {leaf_count}")
+    peaks = peaks_of(leaf_count)
+    # Peak holding the leaf: the first whose range reaches past it
+    covered = 0
+    for position, (height, _) in enumerate(peaks):
+        covered += 1 << height
+        if leaf_index < covered:
+            break
+
+    siblings = [(h, (leaf_index >> h) ^ 1) for h in range(height)]
+    other_peaks = peaks[:position] + peaks[position + 1:]
+    with transaction() as cur:
+        nodes = _fetch_nodes(cur, siblings + other_peaks)
+
+    proof = [
+        {"side": "L" if (leaf_index >> h) & 1 else "R", "hash": nodes[(h, idx)]}
+        for h, idx in siblings
+    ]
+    right = bag_peaks([nodes[p] for p in peaks[position + 1:]])
+    if right:
+        proof.append({"side": "R", "hash": right})
+    for peak in reversed(peaks[:position]):
+        proof.append({"side": "L", "hash": nodes[peak]})
+    return proof
+
+
+# ── Backfill ──────────────────────────────────────────────────────────────────
+def backfill() -> int:
+    """
+    Append every asset without a leaf, oldest first, in one transaction. Only
+    the current peaks are kept in memory; new nodes and leaf indexes are
+    written back with COPY in batches. Returns how many assets were added.
+    """
+    with transaction() as cur:
+        cur.execute("INSERT INTO registry_state (id, leaf_count) VALUES (1, 0) ON CONFLICT (id) DO NOTHING")
+        cur.execute("SELECT leaf_count FROM registry_state WHERE id = 1 FOR UPDATE")
+        start = leaf_count = cur.fetchone()["leaf_count"]
+        peaks = peaks_of(leaf_count)
+        known = _fetch_nodes(cur, peaks)
+        stack = [(height, idx, known[(height, idx)]) for height, idx in peaks]
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS registry_backfill (id INTEGER PRIMARY KEY, leaf BIGINT) ON COMMIT DROP")
+
+        # Snapshot cursor: the UPDATEs below don't change what it returns
+        pending = cur.connection.cursor(name="assetblock_backfill", cursor_factory=TimedCursor)
+        pending.execute("SELECT id, hash FROM assets WHERE mmr_leaf_index IS NULL ORDER BY id")
+        while rows := pending.fetchmany(BACKFILL_BATCH):
+            nodes, leaves = io.StringIO(), io.StringIO()
+            for row in rows:
+                node = (0, leaf_count, leaf_hash(row["hash"]))
+                nodes.write("%d\t%d\t%s\n" % node)
+                while stack and stack[-1][0] == node[0]:
+                    left = stack.pop()
+                    node = (node[0] + 1, node[1] >> 1, merkle_parent(left[2], node[2]))
+                    nodes.write("%d\t%d\t%s\n" % node)
+                stack.append(node)
+                leaves.write(f"{row['id']}\t{leaf_count}\n")
+                leaf_count += 1
+            nodes.seek(0)
+            leaves.seek(0)
+            cur.copy_expert("COPY registry_nodes (height, idx, hash) FROM STDIN", nodes)
+            cur.execute("TRUNCATE registry_backfill")
+            cur.copy_expert("COPY registry_backfill FROM STDIN", leaves)
+            cur.execute("UPDATE assets a SET mmr_leaf_index = b.leaf FROM registry_backfill b WHERE a.id = b.id")
+        pending.close()
+
+        cur.execute(
+            "UPDATE registry_state SET leaf_count = %s, root = %s, updated_at = CURRENT_TIMESTAMP WHERE id = 1",
+            (leaf_count, bag_peaks([node[2] for node in stack])),
+        )
+    return leaf_count - start
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="AssetBlock registry tree maintenance")
+    parser.add_argument("--backfill", action="store_true", help="add assets registered before the tree existed")
+    args = parser.parse_args()
+    if args.backfill:
+        print(f"🌳 Added {backfill()} asset(s) to the registry tree.")
+    state = registry_root()
+    print(f"Registry root: {state['root']} ({state['leaf_count']} leaves)")
@@ -20,20 +20,56 @@ CREATE TABLE IF NOT EXISTS assets (
     status      VARCHAR(20) DEFAULT 'Active',
     owner_uid   VARCHAR(128) REFERENCES users(uid) ON DELETE SET NULL,
     created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    merkle_root       VARCHAR(64),
+    merkle_chunk_size INTEGER,
+    mmr_leaf_index BIGINT UNIQUE  -- leaf position in the registry tree
 );
 
+-- Hash-chained ledger (ledger.py); asset_id has no FK so entries outlive deleted assets
 CREATE TABLE IF NOT EXISTS transfer_history (
     id              SERIAL PRIMARY KEY,
-    asset_id        INTEGER REFERENCES assets(id) ON DELETE CASCADE,
+    asset_id        INTEGER,
     from_uid        VARCHAR(128),
     to_uid          VARCHAR(128),
     from_email      VARCHAR(255),
     to_email        VARCHAR(255),
     transferred_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    note            TEXT DEFAULT ''
+    note            TEXT DEFAULT '',
+    prev_hash       VARCHAR(64),
+    asset_prev_hash VARCHAR(64),
+    entry_hash      VARCHAR(64)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS transfer_history_entry_hash ON transfer_history (entry_hash);
+CREATE INDEX IF NOT EXISTS transfer_history_asset_chain ON transfer_history (asset_id, id);
+CREATE INDEX IF NOT EXISTS transfer_history_unsealed ON transfer_history (id) WHERE entry_hash IS NULL;
+
+CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+    id                SERIAL PRIMARY KEY,
+    last_entry_id     INTEGER NOT NULL,
+    entry_hash        VARCHAR(64) NOT NULL,
+    entries_verified  BIGINT NOT NULL DEFAULT 0,
+    verified_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Merkle mountain range over registered asset hashes (registry_tree.py)
+CREATE TABLE IF NOT EXISTS registry_nodes (
+    height  SMALLINT NOT NULL,
+    idx     BIGINT NOT NULL,
+    hash    VARCHAR(64) NOT NULL,
+    PRIMARY KEY (height, idx)
 );
 
+CREATE TABLE IF NOT EXISTS registry_state (
+    id          SMALLINT PRIMARY KEY CHECK (id = 1),
+    leaf_count  BIGINT NOT NULL DEFAULT 0,
+    root        VARCHAR(64),
+    updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO registry_state (id, leaf_count) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
+
 CREATE TABLE IF NOT EXISTS activity_log (
     id          SERIAL PRIMARY KEY,
     uid         VARCHAR(128),
@@ -42,3 +78,48 @@ CREATE TABLE IF NOT EXISTS activity_log (
     details     TEXT DEFAULT '',
     created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+-- Stored responses for Idempotency-Key retries (idempotency.py)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key               VARCHAR(64) PRIMARY KEY,  -- sha256 of method, path and client key
+    method            VARCHAR(8) NOT NULL,
+    path              TEXT NOT NULL,
+    fingerprint       VARCHAR(64) NOT NULL,
+    status_code       SMALLINT,                 -- NULL while the first request is running
+    response_headers  TEXT,
+    response_body     BYTEA,
+    created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at        TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at);
+
+-- Per-table change counters (cheap ETag version markers for read endpoints)
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name  VARCHAR(64) PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_version ON users;
+CREATE TRIGGER users_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS assets_version ON assets;
+CREATE TRIGGER assets_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON assets
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS transfer_history_version ON transfer_history;
+CREATE TRIGGER transfer_history_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON transfer_history
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS activity_log_version ON activity_log;
+CREATE TRIGGER activity_log_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON activity_log
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
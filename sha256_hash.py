@@ -4,6 +4,15 @@ Generates a unique fingerprint for every uploaded file.
 """
 
 import hashlib
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MERKLE_CHUNK_SIZE = 4 * 1024 * 1024
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
 
 
 def generate_hash(file_bytes: bytes) -> str:
@@ -13,6 +22,261 @@ def generate_hash(file_bytes: bytes) -> str:
     return sha256.hexdigest()
 
 
+def new_hasher():
+    """Incremental SHA-256 hasher for streamed content (update / hexdigest)."""
+    return hashlib.sha256()
+
+
 def hash_string(text: str) -> str:
     """Generate SHA-256 hash from a string."""
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ── Files & streams ───────────────────────────────────────────────────────────
+def hash_stream(fileobj, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """SHA-256 of a binary file object, read with readinto() into one reused buffer."""
+    sha256 = hashlib.sha256()
+    readinto = getattr(fileobj, "readinto", None)
+    if readinto is None:
+        while chunk := fileobj.read(chunk_size):
+            sha256.update(chunk)
+        return sha256.hexdigest()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    while n := readinto(buf):
+        sha256.update(view[:n])
+    return sha256.hexdigest()
+
+
+def hash_file(path, chunk_size: int = HASH_CHUNK_SIZE, use_mmap: bool = True) -> str:
+    """
+    SHA-256 of a file on disk without loading it into memory. The file is
+    memory-mapped and hashed in `chunk_size` windows straight from the page
+    cache; files that can't be mapped fall back to hash_stream().
+    """
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if use_mmap and size > 0:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                mapped = None
+            if mapped is not None:
+                sha256 = hashlib.sha256()
+                with mapped, memoryview(mapped) as view:
+                    for offset in range(0, size, chunk_size):
+                        sha256.update(view[offset:offset + chunk_size])
+                return sha256.hexdigest()
+        return hash_stream(f, chunk_size)
+
+
+# ── Bulk hashing ──────────────────────────────────────────────────────────────
+class HashResult(NamedTuple):
+    path: str
+    size: int
+    digest: Optional[str]
+    error: Optional[str] = None
+
+
+def _hash_job(path, chunk_size: int, use_mmap: bool) -> str:
+    # Module-level so process pools can pickle it
+    return hash_file(path, chunk_size, use_mmap=use_mmap)
+
+
+def hash_many(
+    paths: Iterable,
+    workers: Optional[int] = None,
+    use_processes: bool = False,
+    chunk_size: int = HASH_CHUNK_SIZE,
+    use_mmap: bool = False,
+    max_pending: Optional[int] = None,
+    progress: Optional[Callable[[int, int, int, int], None]] = None,
+) -> Iterator[HashResult]:
+    """
+    Hash many files in parallel, yielding HashResult in completion order.
+
+    Files are scheduled largest first so a big file never starts last and
+    leaves the other workers idle at the end. Threads scale because hashlib
+    releases the GIL; use_processes trades startup cost for full isolation.
+    Memory stays bounded: each worker holds one chunk_size buffer (streaming
+    reads by default) and at most max_pending jobs are queued at a time.
+    progress(files_done, files_total, bytes_done, bytes_total) runs after each file.
+    """
+    workers = workers or os.cpu_count() or 4
+    max_pending = max_pending or workers * 2
+    jobs, failed = [], []
+    for path in paths:
+        try:
+            jobs.append((os.stat(path).st_size, path))
+        except OSError as e:
+            failed.append(HashResult(str(path), 0, None, str(e)))
+    jobs.sort(key=lambda job: job[0], reverse=True)
+
+    files_total = len(jobs) + len(failed)
+    bytes_total = sum(size for size, _ in jobs)
+    files_done = bytes_done = 0
+    for result in failed:
+        files_done += 1
+        if progress:
+            progress(files_done, files_total, bytes_done, bytes_total)
+        yield result
+
+    executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    queue = iter(jobs)
+    pending = {}
+    with executor(max_workers=workers) as pool:
+        try:
+            while True:
+                for size, path in queue:
+                    pending[pool.submit(_hash_job, path, chunk_size, use_mmap)] = (size, path)
+                    if len(pending) >= max_pending:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    size, path = pending.pop(future)
+                    try:
+                        result = HashResult(str(path), size, future.result())
+                    except Exception as e:
+                        result = HashResult(str(path), size, None, str(e))
+                    files_done += 1
+                    bytes_done += size
+                    if progress:
+                        progress(files_done, files_total, bytes_done, bytes_total)
+                    yield result
+        finally:
+            # Consumer stopped early: drop queued work instead of finishing it
+            for future in pending:
+                future.cancel()
+
+
+# ── Merkle fingerprint ────────────────────────────────────────────────────────
+# Fixed-size chunks are leaves: sha256(0x00 || chunk). Parents are
+# sha256(0x01 || left || right); an odd node at the end of a level is promoted
+# unchanged. The prefixes keep a leaf from ever being passed off as a parent.
+
+def merkle_leaf(chunk) -> str:
+    """Leaf hash of one chunk."""
+    sha256 = hashlib.sha256(_LEAF_PREFIX)
+    sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def merkle_parent(left: str, right: str) -> str:
+    """Parent hash of two child hashes (hex)."""
+    return hashlib.sha256(_NODE_PREFIX + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def merkle_levels(leaves: list) -> list:
+    """Every level of the tree, leaves first and the root last (odd trailing nodes promoted)."""
+    levels = [list(leaves) or [merkle_leaf(b"")]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        paired = [merkle_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        levels.append(paired)
+    return levels
+
+
+def merkle_root(leaves: list) -> str:
+    """Root over leaf hashes; an empty file is a single empty leaf."""
+    return merkle_levels(leaves)[-1][0]
+
+
+def proof_from_levels(levels: list, index: int) -> list:
+    """Sibling path for leaf `index` read from prebuilt merkle_levels(); no hashing."""
+    if not 0 <= index < len(levels[0]):
+        raise IndexError(f"leaf {index} out of range for {len(levels[0])} leaves")
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"side": "L" if sibling < index else "R", "hash": level[sibling]})
+        index //= 2
+    return proof
+
+
+def merkle_proof(leaves: list, index: int) -> list:
+    """Sibling path for leaf `index`: [{"side": "L"|"R", "hash": ...}, ...] from leaf to root.
+    For several leaves of one tree, build merkle_levels() once and use proof_from_levels()."""
+    if not 0 <= index < len(leaves):
+        raise IndexError(f"leaf {index} out of range for {len(leaves)} leaves")
+    return proof_from_levels(merkle_levels(leaves), index)
+
+
+def verify_merkle_proof(leaf_hash: str, proof: list, root: str) -> bool:
+    """Fold a sibling path back up and compare with the expected root."""
+    node = leaf_hash
+    for step in proof:
+        node = merkle_parent(step["hash"], node) if step["side"] == "L" else merkle_parent(node, step["hash"])
+    return node == root
+
+
+def verify_chunk(chunk, proof: list, root: str) -> bool:
+    """True if `chunk` is the leaf the proof was issued for under `root`."""
+    return verify_merkle_proof(merkle_leaf(chunk), proof, root)
+
+
+def chunk_span(start: int, end: int, chunk_size: int = MERKLE_CHUNK_SIZE) -> range:
+    """Indices of the chunks covering bytes start..end (inclusive)."""
+    return range(start // chunk_size, end // chunk_size + 1)
+
+
+class MerkleHasher:
+    """Incremental Merkle fingerprint; feed arbitrary-sized pieces with update()."""
+
+    def __init__(self, chunk_size: int = MERKLE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.leaves = []
+        self._pending = bytearray()
+
+    def update(self, data):
+        view = memoryview(data)
+        if self._pending:
+            take = self.chunk_size - len(self._pending)
+            self._pending += view[:take]
+            view = view[take:]
+            if len(self._pending) < self.chunk_size:
+                return
+            self.leaves.append(merkle_leaf(self._pending))
+            self._pending.clear()
+        # Whole chunks are hashed straight from the caller's buffer
+        while len(view) >= self.chunk_size:
+            self.leaves.append(merkle_leaf(view[:self.chunk_size]))
+            view = view[self.chunk_size:]
+        self._pending += view
+
+    def finish(self) -> list:
+        """Flush the trailing partial chunk and return all leaves."""
+        if self._pending or not self.leaves:
+            self.leaves.append(merkle_leaf(self._pending))
+            self._pending.clear()
+        return self.leaves
+
+    def hexdigest(self) -> str:
+        return merkle_root(self.finish())
+
+
+def merkle_leaves_of_file(path, chunk_size: int = MERKLE_CHUNK_SIZE, workers: int = 4) -> list:
+    """
+    Leaf hashes of a file on disk, hashed in parallel. hashlib releases the GIL
+    on large buffers, so a thread pool spreads the work across cores.
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+    count = max(1, -(-size // chunk_size))
+
+    def leaf_at(index):
+        with open(path, "rb") as f:
+            f.seek(index * chunk_size)
+            return merkle_leaf(f.read(chunk_size))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(leaf_at, range(count)))
+
+
+def merkle_hash_file(path, chunk_size: int = MERKLE_CHUNK_SIZE, workers: int = 4) -> str:
+    """Merkle root of a file on disk, leaves hashed in parallel."""
+    return merkle_root(merkle_leaves_of_file(path, chunk_size, workers))
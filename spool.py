@@ -0,0 +1,83 @@
+"""
+spool.py — Durable local queue for writes that can wait out a database outage.
+Records are appended as JSON lines to ASSETBLOCK_SPOOL_DIR/<name>.jsonl with a
+single O_APPEND write each, so concurrent workers never interleave lines, and
+fsynced before the request returns. replay() claims the file by renaming it,
+hands the records to a writer in one batch, and re-queues them if it fails.
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# A claimed file still present after this long belongs to a worker that died mid-replay
+ABANDONED_SECONDS = 60
+
+
+def spool_dir() -> Path:
+    return Path(os.getenv("ASSETBLOCK_SPOOL_DIR") or Path(tempfile.gettempdir()) / "assetblock-spool")
+
+
+def append(name: str, record: dict):
+    path = spool_dir() / f"{name}.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record, default=str) + "\n").encode()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    try:
+        os.write(fd, line)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def pending(name: str) -> bool:
+    return (spool_dir() / f"{name}.jsonl").exists()
+
+
+def _claim(path: Path, name: str) -> Path:
+    claimed = path.with_name(f"{name}.{uuid.uuid4().hex}.replay")
+    os.replace(path, claimed)  # FileNotFoundError if another worker got there first
+    os.utime(claimed)  # restart the abandonment clock, so nobody else reclaims it
+    return claimed
+
+
+def _claimed_files(name: str) -> list:
+    directory = spool_dir()
+    candidates = [directory / f"{name}.jsonl"]
+    for orphan in directory.glob(f"{name}.*.replay"):
+        try:
+            if time.time() - orphan.stat().st_mtime > ABANDONED_SECONDS:
+                candidates.append(orphan)
+        except FileNotFoundError:
+            pass
+    claimed = []
+    for path in candidates:
+        try:
+            claimed.append(_claim(path, name))
+        except FileNotFoundError:
+            pass
+    return claimed
+
+
+def replay(name: str, write) -> int:
+    """Pass every spooled record to write(records); returns how many were written."""
+    files = _claimed_files(name)
+    records = []
+    for path in files:
+        with open(path) as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    if records:
+        try:
+            write(records)
+        except Exception:
+            for record in records:
+                append(name, record)
+            for path in files:
+                path.unlink(missing_ok=True)
+            raise
+    for path in files:
+        path.unlink(missing_ok=True)
+    return len(records)
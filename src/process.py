@@ -70,10 +70,35 @@ def create_tables():
         );
     """)
 
+    # Columns added after the first release; ALTER also upgrades existing databases
+    cur.execute("ALTER TABLE assets ADD COLUMN IF NOT EXISTS merkle_root VARCHAR(64);")
+    cur.execute("ALTER TABLE assets ADD COLUMN IF NOT EXISTS merkle_chunk_size INTEGER;")
+    cur.execute("ALTER TABLE assets ADD COLUMN IF NOT EXISTS mmr_leaf_index BIGINT UNIQUE;")
+
+    # Merkle mountain range over registered asset hashes (registry_tree.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS registry_nodes (
+            height  SMALLINT NOT NULL,
+            idx     BIGINT NOT NULL,
+            hash    VARCHAR(64) NOT NULL,
+            PRIMARY KEY (height, idx)
+        );
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS registry_state (
+            id          SMALLINT PRIMARY KEY CHECK (id = 1),
+            leaf_count  BIGINT NOT NULL DEFAULT 0,
+            root        VARCHAR(64),
+            updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    cur.execute("INSERT INTO registry_state (id, leaf_count) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;")
+
+    # Hash-chained ledger (ledger.py); no FK on asset_id so entries outlive deleted assets
     cur.execute("""
         CREATE TABLE IF NOT EXISTS transfer_history (
             id              SERIAL PRIMARY KEY,
-            asset_id        INTEGER REFERENCES assets(id) ON DELETE CASCADE,
+            asset_id        INTEGER,
             from_uid        VARCHAR(128),
             to_uid          VARCHAR(128),
             from_email      VARCHAR(255),
@@ -82,6 +107,26 @@ def create_tables():
             note            TEXT DEFAULT ''
         );
     """)
+    cur.execute("ALTER TABLE transfer_history DROP CONSTRAINT IF EXISTS transfer_history_asset_id_fkey;")
+    cur.execute("ALTER TABLE transfer_history ADD COLUMN IF NOT EXISTS prev_hash VARCHAR(64);")
+    cur.execute("ALTER TABLE transfer_history ADD COLUMN IF NOT EXISTS asset_prev_hash VARCHAR(64);")
+    cur.execute("ALTER TABLE transfer_history ADD COLUMN IF NOT EXISTS entry_hash VARCHAR(64);")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS transfer_history_entry_hash ON transfer_history (entry_hash);")
+    cur.execute("CREATE INDEX IF NOT EXISTS transfer_history_asset_chain ON transfer_history (asset_id, id);")
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS transfer_history_unsealed
+        ON transfer_history (id) WHERE entry_hash IS NULL;
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+            id                SERIAL PRIMARY KEY,
+            last_entry_id     INTEGER NOT NULL,
+            entry_hash        VARCHAR(64) NOT NULL,
+            entries_verified  BIGINT NOT NULL DEFAULT 0,
+            verified_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
 
     cur.execute("""
         CREATE TABLE IF NOT EXISTS activity_log (
@@ -94,6 +139,48 @@ def create_tables():
         );
     """)
 
+    # Stored responses for Idempotency-Key retries (idempotency.py)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            key               VARCHAR(64) PRIMARY KEY,
+            method            VARCHAR(8) NOT NULL,
+            path              TEXT NOT NULL,
+            fingerprint       VARCHAR(64) NOT NULL,
+            status_code       SMALLINT,
+            response_headers  TEXT,
+            response_body     BYTEA,
+            created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at        TIMESTAMP NOT NULL
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at);")
+
+    # Per-table change counters, bumped by statement triggers (ETag markers)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name  VARCHAR(64) PRIMARY KEY,
+            version     BIGINT NOT NULL DEFAULT 0
+        );
+    """)
+
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    for table in ("users", "assets", "transfer_history", "activity_log"):
+        cur.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table};")
+        cur.execute(f"""
+            CREATE TRIGGER {table}_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+        """)
+
     conn.commit()
     cur.close()
     conn.close()
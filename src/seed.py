@@ -0,0 +1,305 @@
+"""
+seed.py — Deterministic bulk loader of synthetic AssetBlock data.
+Generates users, assets (distinct SHA-256 values with realistic names, types
+and sizes), transfer chains that end at each asset's current owner, and
+activity logs, and COPYs them in from parallel worker processes. Each chunk
+draws from its own RNG keyed by (seed, table, chunk), so a seed produces the
+same rows whatever the worker count. Every table gets explicit ids from a
+per-chunk base, so the same seed also yields the same ids (and, since the
+ledger chains by id, the same ledger heads). Afterwards the transfer ledger is sealed
+and the new assets are appended to the registry tree.
+Run after process.py, against an empty database (or with a fresh --seed):
+    python src/seed.py --users 200000 --assets 5000000 --transfers 2000000 --activity 5000000
+"""
+
+import argparse
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import get_connection  # noqa: E402
+from sha256_hash import hash_string  # noqa: E402
+
+CHUNK_ROWS = 100_000
+ID_TABLES = ("users", "assets", "transfer_history", "activity_log")
+DEFAULT_UNTIL = "2026-01-01"
+
+# (mime type, extension, weight, median bytes, log-normal sigma, name stems)
+FILE_KINDS = [
+    ("image/jpeg", ".jpg", 30, 2_500_000, 0.8, ("IMG", "DSC", "photo", "scan")),
+    ("image/png", ".png", 14, 600_000, 1.0, ("screenshot", "logo", "diagram", "render")),
+    ("application/pdf", ".pdf", 18, 350_000, 1.2, ("contract", "invoice", "report", "deed", "certificate")),
+    ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx", 7, 120_000, 0.9,
+     ("agreement", "memo", "draft", "letter")),
+    ("text/plain", ".txt", 5, 8_000, 1.5, ("notes", "readme", "log", "manifest")),
+    ("application/zip", ".zip", 8, 40_000_000, 1.3, ("archive", "backup", "export", "bundle")),
+    ("video/mp4", ".mp4", 6, 90_000_000, 1.1, ("VID", "clip", "recording", "footage")),
+    ("audio/mpeg", ".mp3", 5, 6_000_000, 0.6, ("track", "voice", "master", "demo")),
+    ("model/gltf-binary", ".glb", 3, 15_000_000, 1.0, ("model", "asset", "scene", "mesh")),
+    ("application/octet-stream", ".bin", 4, 1_000_000, 2.0, ("data", "blob", "firmware", "dump")),
+]
+KIND_WEIGHTS = [kind[2] for kind in FILE_KINDS]
+STATUSES, STATUS_WEIGHTS = ("Active", "Pending", "Suspended"), (92, 5, 3)
+ACTIONS, ACTION_WEIGHTS = ("LOGIN", "UPLOAD", "TRANSFER", "STATUS", "REGISTER"), (45, 25, 18, 4, 8)
+DESCRIPTIONS = ("", "", "Original file", "Signed copy", "Final version", "Client delivery", "Archived master")
+
+
+def user_uid(seed: int, i: int) -> str:
+    return f"seed{seed}-user-{i:09d}"
+
+
+def user_email(seed: int, i: int) -> str:
+    return f"user{i}.s{seed}@example.com"
+
+
+def owner_index(rng: random.Random, users: int) -> int:
+    """Skewed towards low indexes: a few heavy owners, a long tail of light ones."""
+    return int(users * rng.random() ** 3)
+
+
+def _rng(seed: int, table: str, chunk: int) -> random.Random:
+    return random.Random(f"{seed}:{table}:{chunk}")
+
+
+def _chain_lengths(job: dict):
+    """Transfer hops per asset of a chunk, from their own stream so they can be counted up front."""
+    rng = _rng(job["seed"], "hops", job["chunk"])
+    chain_p = job["transfer_ratio"] / (1 + job["transfer_ratio"])  # geometric chain length with that mean
+    for _ in range(job["count"]):
+        hops = 0
+        while rng.random() < chain_p and hops < 50:
+            hops += 1
+        yield hops if job["users"] >= 2 else 0
+
+
+def count_transfers(job: dict) -> int:
+    """Worker: how many transfer rows gen_assets will write for this chunk."""
+    return sum(_chain_lengths(job))
+
+
+# ── Row generators (one chunk each) ───────────────────────────────────────────
+def gen_users(job: dict, out):
+    seed, start, count = job["seed"], job["start"], job["count"]
+    rng = _rng(seed, "users", job["chunk"])
+    since = job["until"] - timedelta(days=job["days"])
+    writer = csv.writer(out)
+    for i in range(start, start + count):
+        joined = since + timedelta(seconds=job["days"] * 86400 * i / job["users"] + rng.random() * 3600)
+        writer.writerow((job["id_base"]["users"] + i, user_uid(seed, i), user_email(seed, i), f"user{i}", "admin" if i == 0 else "client",
+                         joined.isoformat()))
+    return count
+
+
+def gen_assets(job: dict, out, transfers_out):
+    """Assets, plus the transfer chain that led to each current owner (ids from job["transfer_id_base"])."""
+    seed, start, count, users = job["seed"], job["start"], job["count"], job["users"]
+    rng = _rng(seed, "assets", job["chunk"])
+    span = job["days"] * 86400
+    since = job["until"] - timedelta(days=job["days"])
+    asset_id_base, transfer_id = job["id_base"]["assets"], job["transfer_id_base"]
+    writer, transfers = csv.writer(out), csv.writer(transfers_out)
+    transferred = 0
+    for i, hops in zip(range(start, start + count), _chain_lengths(job)):
+        mime, ext, _, median, sigma, stems = rng.choices(FILE_KINDS, weights=KIND_WEIGHTS)[0]
+        created = since + timedelta(seconds=span * i / job["assets"] + rng.random() * 600)
+        owner = owner_index(rng, users)
+        writer.writerow((
+            asset_id_base + i,
+            f"{rng.choice(stems)}_{rng.randint(1, 99999):05d}{ext}",
+            hash_string(f"assetblock-seed:{seed}:{i}"),
+            mime,
+            max(1, int(median * rng.lognormvariate(0, sigma))),
+            rng.choice(DESCRIPTIONS),
+            rng.choices(STATUSES, weights=STATUS_WEIGHTS)[0],
+            user_uid(seed, owner),
+            created.isoformat(),
+            created.isoformat(),
+        ))
+
+        # Walk the chain backwards from the current owner
+        if not hops:
+            continue
+        holders = [owner]
+        for _ in range(hops):
+            previous = owner_index(rng, users)
+            while previous == holders[-1]:
+                previous = rng.randrange(users)
+            holders.append(previous)
+        holders.reverse()
+        remaining = max((job["until"] - created).total_seconds(), hops)
+        times = sorted(created + timedelta(seconds=rng.random() * remaining) for _ in range(hops))
+        for (a, b), at in zip(zip(holders, holders[1:]), times):
+            transfers.writerow((transfer_id, asset_id_base + i, user_uid(seed, a), user_uid(seed, b),
+                                user_email(seed, a), user_email(seed, b), at.isoformat(), ""))
+            transfer_id += 1
+        transferred += hops
+    return count + transferred
+
+
+def gen_activity(job: dict, out):
+    seed, start, count, users = job["seed"], job["start"], job["count"], job["users"]
+    rng = _rng(seed, "activity", job["chunk"])
+    since = job["until"] - timedelta(days=job["days"])
+    span = job["days"] * 86400
+    writer = csv.writer(out)
+    for i in range(start, start + count):
+        who = owner_index(rng, users)
+        action = rng.choices(ACTIONS, weights=ACTION_WEIGHTS)[0]
+        writer.writerow((job["id_base"]["activity_log"] + i, user_uid(seed, who), user_email(seed, who), action, f"synthetic {action.lower()}",
+                         (since + timedelta(seconds=rng.random() * span)).isoformat()))
+    return count
+
+
+COPY_SQL = {
+    "users": "COPY users (id, uid, email, username, role, created_at) FROM STDIN WITH (FORMAT csv)",
+    "assets": "COPY assets (id, asset_name, hash, file_type, file_size, description, status, owner_uid, "
+              "created_at, updated_at) FROM STDIN WITH (FORMAT csv)",
+    "transfer_history": "COPY transfer_history (id, asset_id, from_uid, to_uid, from_email, to_email, transferred_at, "
+                        "note) FROM STDIN WITH (FORMAT csv)",
+    "activity_log": "COPY activity_log (id, uid, email, action, details, created_at) FROM STDIN WITH (FORMAT csv)",
+}
+
+
+def load_chunk(job: dict) -> tuple:
+    """Worker: generate one chunk in memory and COPY it in on its own connection."""
+    out, extra = io.StringIO(), io.StringIO()
+    if job["table"] == "users":
+        rows = gen_users(job, out)
+    elif job["table"] == "assets":
+        rows = gen_assets(job, out, extra)
+    else:
+        rows = gen_activity(job, out)
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            out.seek(0)
+            cur.copy_expert(COPY_SQL[job["table"]], out)
+            if extra.tell():
+                extra.seek(0)
+                cur.copy_expert(COPY_SQL["transfer_history"], extra)
+        conn.commit()
+    finally:
+        conn.close()
+    return job["table"], rows
+
+
+def _jobs(table: str, total: int, chunk_rows: int, **shared) -> list:
+    return [
+        {"table": table, "chunk": n, "start": start, "count": min(chunk_rows, total - start), **shared}
+        for n, start in enumerate(range(0, total, chunk_rows))
+    ]
+
+
+def _run_phase(pool, jobs: list, label: str) -> int:
+    started, rows = time.perf_counter(), 0
+    for done, (_, count) in enumerate(pool.imap_unordered(load_chunk, jobs), 1):
+        rows += count
+        elapsed = time.perf_counter() - started
+        print(f"\r   {label}: {done}/{len(jobs)} chunks · {rows:,} rows · {rows / max(elapsed, 1e-6):,.0f} rows/s",
+              end="", flush=True)
+    if jobs:
+        print()
+    return rows
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+def seed(users: int, assets: int, transfers: int, activity: int, seed_value: int = 42,
+         workers: int = os.cpu_count() or 4, chunk_rows: int = CHUNK_ROWS,
+         until: str = DEFAULT_UNTIL, days: int = 730, finalize: bool = True) -> dict:
+    """Load the requested volumes; returns row counts and timings."""
+    if users < 1 and (assets or activity):
+        raise ValueError("assets and activity need at least one user")
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            id_base = {}
+            for table in ID_TABLES:
+                cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+                id_base[table] = cur.fetchone()[0] + 1
+    finally:
+        conn.close()
+
+    shared = {
+        "seed": seed_value, "users": users, "assets": assets, "days": days,
+        "until": datetime.fromisoformat(until), "id_base": id_base,
+        "transfer_ratio": transfers / assets if assets else 0,
+    }
+    timings, started = {}, time.perf_counter()
+    with Pool(workers) as pool:
+        t = time.perf_counter()
+        user_rows = _run_phase(pool, _jobs("users", users, chunk_rows, **shared), "users")
+        timings["users_s"] = round(time.perf_counter() - t, 2)
+        t = time.perf_counter()
+        # Each asset chunk's transfer ids start after all earlier chunks' transfers
+        asset_jobs = _jobs("assets", assets, chunk_rows, **shared)
+        next_transfer_id = id_base["transfer_history"]
+        for job, count in zip(asset_jobs, pool.map(count_transfers, asset_jobs)):
+            job["transfer_id_base"], next_transfer_id = next_transfer_id, next_transfer_id + count
+        # Assets (with their transfer chains) and activity only depend on users, so share one phase
+        jobs = asset_jobs + _jobs("activity_log", activity, chunk_rows, **shared)
+        other_rows = _run_phase(pool, jobs, "assets + transfers + activity")
+        timings["assets_activity_s"] = round(time.perf_counter() - t, 2)
+
+    conn = get_connection()
+    try:
+        with conn.cursor() as cur:
+            # Explicit ids bypassed the sequences
+            for table in ID_TABLES:
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"GREATEST((SELECT MAX(id) FROM {table}), 1))")
+            conn.commit()
+            conn.autocommit = True
+            cur.execute("ANALYZE users, assets, transfer_history, activity_log")
+    finally:
+        conn.close()
+
+    if finalize:
+        import ledger
+        import registry_tree
+
+        t = time.perf_counter()
+        timings["ledger_sealed"] = ledger.seal()
+        timings["ledger_s"] = round(time.perf_counter() - t, 2)
+        t = time.perf_counter()
+        timings["registry_leaves"] = registry_tree.backfill()
+        timings["registry_s"] = round(time.perf_counter() - t, 2)
+
+    timings["total_s"] = round(time.perf_counter() - started, 2)
+    return {"rows": user_rows + other_rows, "asset_id_base": id_base["assets"], **timings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--assets", type=int, default=100_000)
+    parser.add_argument("--transfers", type=int, default=50_000, help="approximate total (chains are random)")
+    parser.add_argument("--activity", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--until", default=DEFAULT_UNTIL, help="latest generated timestamp (ISO date)")
+    parser.add_argument("--days", type=int, default=730, help="history length before --until")
+    parser.add_argument("--no-finalize", action="store_true", help="skip ledger sealing and registry backfill")
+    args = parser.parse_args()
+
+    print(f"🌱 Seeding {args.users:,} users, {args.assets:,} assets, ~{args.transfers:,} transfers, "
+          f"{args.activity:,} activity rows (seed {args.seed}, {args.workers} workers)")
+    result = seed(args.users, args.assets, args.transfers, args.activity, args.seed, args.workers,
+                  args.chunk_rows, args.until, args.days, finalize=not args.no_finalize)
+    print(f"✅ {result['rows']:,} rows in {result['total_s']}s · {math.floor(result['rows'] / max(result['total_s'], 1e-6)):,} rows/s")
+    for key, value in result.items():
+        if key not in ("rows", "total_s"):
+            print(f"   {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,16 @@ Run: streamlit run src/server/server.py
 
 import streamlit as st
 import requests
+import hashlib
+import time
+import uuid
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pyrebase
 import os
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -240,33 +246,152 @@ init_session()
 
 
 # ── API Helpers ────────────────────────────────────────────────────────────────
+GET_CACHE_TTL = 5       # seconds a GET response is reused without asking the API
+GET_CACHE_SIZE = 64
+
+
+@st.cache_resource
+def http_session() -> requests.Session:
+    """Process-wide keep-alive session: pooled connections, retried GETs."""
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        # Not 503: the API answers that at once while the database is down (see Retry-After)
+        status_forcelist=(502, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def invalidate_get_cache():
+    """Force revalidation of every cached GET after this session writes."""
+    cache = st.session_state.setdefault("http_cache", {})
+    for endpoint, (_, etag, data) in cache.items():
+        cache[endpoint] = (0.0, etag, data)
+
+
+# Firebase ID tokens last an hour; refresh a little before that
+ID_TOKEN_TTL = 50 * 60
+
+
+def id_token():
+    """The signed-in admin's Firebase ID token, refreshed when close to expiry."""
+    if not st.session_state.get("refresh_token"):
+        return None
+    if time.time() - st.session_state.get("id_token_at", 0) > ID_TOKEN_TTL:
+        try:
+            fresh = auth_client.refresh(st.session_state.refresh_token)
+        except Exception:
+            return st.session_state.get("id_token")
+        st.session_state.id_token, st.session_state.refresh_token = fresh["idToken"], fresh["refreshToken"]
+        st.session_state.id_token_at = time.time()
+    return st.session_state.id_token
+
+
+def caller_headers(**extra) -> dict:
+    """Identify the signed-in admin: per-user rate limiting, and a Bearer token for admin-only endpoints."""
+    if st.session_state.get("uid"):
+        extra["X-AssetBlock-Uid"] = st.session_state.uid
+    token = id_token()
+    if token:
+        extra["Authorization"] = f"Bearer {token}"
+    return extra
+
+
+def show_degraded_banner(slot):
+    """Fill `slot` (an st.empty() at the top of the page) if any read this run was degraded."""
+    degraded = st.session_state.get("api_degraded")
+    if degraded == "stale":
+        slot.warning("The database is temporarily unavailable. Showing the last known data; "
+                     "changes will fail until it recovers.")
+    elif degraded == "down":
+        slot.warning("The database is temporarily unavailable. Please retry in a few seconds.")
+    elif degraded == "throttled":
+        slot.warning("Too many requests right now. Showing the last known data; please slow down.")
+
+
 def api_get(endpoint):
+    # Fresh entries are served locally; stale ones are revalidated by ETag
+    cache = st.session_state.setdefault("http_cache", {})
+    cached = cache.get(endpoint)
+    if cached and time.monotonic() - cached[0] < GET_CACHE_TTL:
+        return cached[2]
+    headers = caller_headers(**({"If-None-Match": cached[1]} if cached and cached[1] else {}))
     try:
-        r = requests.get(f"{API}{endpoint}", timeout=10)
-        return r.json() if r.status_code == 200 else None
+        r = http_session().get(f"{API}{endpoint}", headers=headers, timeout=10)
+        if r.status_code == 304 and cached:
+            cache[endpoint] = (time.monotonic(), cached[1], cached[2])
+            return cached[2]
+        if r.status_code == 429:
+            st.session_state.api_degraded = "throttled"
+            return cached[2] if cached else None
+        if r.status_code == 503:
+            # Database down: keep showing what this session last saw
+            st.session_state.api_degraded = "stale" if cached else "down"
+            return cached[2] if cached else None
+        if r.status_code != 200:
+            return None
+        data = r.json()
+        if r.headers.get("X-AssetBlock-Stale"):
+            st.session_state.api_degraded = "stale"
+            return data  # never cached as fresh
+        cache.pop(endpoint, None)
+        cache[endpoint] = (time.monotonic(), r.headers.get("ETag"), data)
+        if len(cache) > GET_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        return data
     except Exception:
         return None
 
 
-def api_post(endpoint, json=None):
+def idempotency_headers(form: str, payload) -> dict:
+    """One Idempotency-Key per form submission: reused on retry, renewed when the payload changes."""
+    keys = st.session_state.setdefault("idempotency_keys", {})
+    digest = hashlib.sha256(repr(payload).encode()).hexdigest()
+    current = keys.get(form)
+    if not current or current[0] != digest:
+        current = keys[form] = (digest, uuid.uuid4().hex)
+    return {"Idempotency-Key": current[1], "Idempotency-Payload-Digest": digest}
+
+
+def settle_idempotency_key(form: str, r):
+    """Forget the key once the API gave a definitive answer (not a 5xx or an in-progress 409)."""
+    if r.status_code < 500 and "Retry-After" not in r.headers:
+        st.session_state.setdefault("idempotency_keys", {}).pop(form, None)
+
+
+def api_post(endpoint, json=None, form=None):
+    """POST; with `form`, a timed-out submission retried by the admin is replayed, not redone."""
+    invalidate_get_cache()
+    headers = caller_headers(**(idempotency_headers(form, (endpoint, json)) if form else {}))
     try:
-        r = requests.post(f"{API}{endpoint}", json=json, timeout=10)
+        r = http_session().post(f"{API}{endpoint}", json=json, headers=headers, timeout=10)
+        if form:
+            settle_idempotency_key(form, r)
         return r.status_code, r.json()
     except Exception as e:
         return 500, {"detail": str(e)}
 
 
 def api_put(endpoint, json=None):
+    invalidate_get_cache()
     try:
-        r = requests.put(f"{API}{endpoint}", json=json, timeout=10)
+        r = http_session().put(f"{API}{endpoint}", json=json, headers=caller_headers(), timeout=10)
         return r.status_code, r.json()
     except Exception as e:
         return 500, {"detail": str(e)}
 
 
 def api_delete(endpoint, params=None):
+    invalidate_get_cache()
     try:
-        r = requests.delete(f"{API}{endpoint}", params=params, timeout=10)
+        r = http_session().delete(f"{API}{endpoint}", params=params, headers=caller_headers(), timeout=10)
         return r.status_code, r.json()
     except Exception as e:
         return 500, {"detail": str(e)}
@@ -310,6 +435,9 @@ def show_auth_page():
                         st.session_state.logged_in = True
                         st.session_state.uid = uid
                         st.session_state.email = email
+                        st.session_state.id_token = user["idToken"]
+                        st.session_state.refresh_token = user["refreshToken"]
+                        st.session_state.id_token_at = time.time()
                         st.rerun()
                     except Exception:
                         st.error("Authentication failed.")
@@ -368,7 +496,8 @@ def page_overview():
     </div>
     """, unsafe_allow_html=True)
 
-    stats = api_get("/stats")
+    overview = api_get("/admin/overview?assets_limit=5&activity_limit=8")
+    stats = overview.get("stats") if overview else None
     if stats:
         c1, c2, c3, c4, c5 = st.columns(5)
         with c1: st.metric("Total Users", stats.get("total_users", 0))
@@ -388,9 +517,7 @@ def page_overview():
         <div style="font-family:'Space Mono',monospace; font-size:10px; color:#B464FF; 
                     letter-spacing:2px; margin-bottom:16px;">RECENT ASSETS</div>
         """, unsafe_allow_html=True)
-        data = api_get("/assets/read")
-        assets = data.get("assets", [])[:5] if data else []
-        for asset in assets:
+        for asset in overview.get("recent_assets", []):
             status = asset.get("status", "Active")
             st.markdown(f"""
             <div class="admin-card">
@@ -411,8 +538,7 @@ def page_overview():
         <div style="font-family:'Space Mono',monospace; font-size:10px; color:#B464FF; 
                     letter-spacing:2px; margin-bottom:16px;">RECENT ACTIVITY</div>
         """, unsafe_allow_html=True)
-        logs = api_get("/activity/admin/all")
-        log_list = logs.get("logs", [])[:8] if logs else []
+        log_list = overview.get("recent_activity", [])
         action_colors = {"UPLOAD": "#00D4FF", "TRANSFER": "#FFB800", "REGISTER": "#00FF88"}
         for log in log_list:
             action = log.get("action", "")
@@ -435,7 +561,82 @@ def page_overview():
             """, unsafe_allow_html=True)
 
 
+# ── Table Paging ───────────────────────────────────────────────────────────────
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def current_page(key, signature):
+    """Page index for a server-paged table; resets when its filters change."""
+    if st.session_state.get(f"{key}_sig") != signature:
+        st.session_state[f"{key}_sig"] = signature
+        st.session_state[f"{key}_page"] = 0
+    return st.session_state.get(f"{key}_page", 0)
+
+
+def render_pager(key, page, total, page_size):
+    pages = max(1, -(-total // page_size))
+    if page >= pages:
+        st.session_state[f"{key}_page"] = pages - 1
+        st.rerun()
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("← PREV", key=f"{key}_prev", disabled=page == 0):
+            st.session_state[f"{key}_page"] = page - 1
+            st.rerun()
+    with col2:
+        st.markdown(f"""
+        <div style="font-family:'Space Mono',monospace; font-size:10px; color:#5A4A7A;
+                    letter-spacing:2px; text-align:center; padding-top:8px;">PAGE {page + 1} / {pages}</div>
+        """, unsafe_allow_html=True)
+    with col3:
+        if st.button("NEXT →", key=f"{key}_next", disabled=page >= pages - 1):
+            st.session_state[f"{key}_page"] = page + 1
+            st.rerun()
+
+
 # ── All Assets Page ────────────────────────────────────────────────────────────
+def bulk_actions(key, asset_ids=None, asset_filter=None):
+    """Status / delete controls applied in one batch request to ids or a filter."""
+    target = {"asset_ids": asset_ids} if asset_ids is not None else {"filter": asset_filter}
+    label = f"{len(asset_ids)} SELECTED" if asset_ids is not None else "ALL MATCHING"
+    st.markdown(f"""
+    <div style="font-family:'Space Mono',monospace; font-size:9px; color:#5A4A7A; letter-spacing:2px; margin-bottom:8px;">
+        BULK ACTIONS · {label}
+    </div>
+    """, unsafe_allow_html=True)
+    col1, col2, col3 = st.columns([1, 1, 1])
+    with col1:
+        new_status = st.selectbox("Status", ["Active", "Pending", "Suspended"], key=f"{key}_status",
+                                  label_visibility="collapsed")
+    with col2:
+        if st.button("SET STATUS", key=f"{key}_set"):
+            code, resp = api_put("/assets/status/batch", json={**target, "status": new_status})
+            if code == 200:
+                st.success(resp.get("message", "Statuses updated."))
+                st.rerun()
+            else:
+                st.error(resp.get("detail", "Bulk update failed."))
+    with col3:
+        confirm = st.checkbox("Confirm delete", key=f"{key}_confirm")
+        if st.button("⊗ DELETE", key=f"{key}_del", disabled=not confirm):
+            code, resp = api_post("/assets/delete/batch", json=target, form=f"delete-batch-{key}")
+            if code == 200:
+                st.success(resp.get("message", "Assets deleted."))
+                st.rerun()
+            else:
+                st.error(resp.get("detail", "Bulk delete failed."))
+
+
+ASSET_SORTS = {
+    "Newest": ("created_at", "desc"),
+    "Oldest": ("created_at", "asc"),
+    "Name": ("asset_name", "asc"),
+    "Largest": ("file_size", "desc"),
+    "Owner": ("owner_email", "asc"),
+    "Status": ("status", "asc"),
+}
+
+
 def page_all_assets():
     st.markdown("""
     <div class="page-header">
@@ -444,89 +645,142 @@ def page_all_assets():
     </div>
     """, unsafe_allow_html=True)
 
-    col1, col2 = st.columns([3, 1])
+    col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
     with col1:
         search = st.text_input("Search assets", placeholder="Name, hash, description...", label_visibility="collapsed")
     with col2:
         status_filter = st.selectbox("Status", ["All", "Active", "Pending", "Suspended"], label_visibility="collapsed")
-
+    with col3:
+        sort_label = st.selectbox("Sort", list(ASSET_SORTS), label_visibility="collapsed")
+    with col4:
+        page_size = st.selectbox("Rows", PAGE_SIZES, label_visibility="collapsed")
+
+    with st.expander("Advanced filters"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            owner_email = st.text_input("Owner email", key="f_owner")
+        with col2:
+            file_type = st.text_input("File type", placeholder="e.g. image/png", key="f_type")
+        with col3:
+            date_range = st.date_input("Registered between", value=(), key="f_dates")
+
+    # The same filter drives the listing and "apply to all matching" bulk actions
+    filters = {}
     if search:
-        data = api_get(f"/assets/search/{search}")
-    else:
-        data = api_get("/assets/read")
-
-    assets = data.get("assets", []) if data else []
-
+        filters["q"] = search
     if status_filter != "All":
-        assets = [a for a in assets if a.get("status") == status_filter]
+        filters["status"] = status_filter
+    if owner_email:
+        filters["owner_email"] = owner_email
+    if file_type:
+        filters["file_type"] = file_type
+    if len(date_range) == 2:
+        filters["created_from"] = datetime.combine(date_range[0], datetime.min.time()).isoformat()
+        filters["created_to"] = datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time()).isoformat()
+
+    sort, order = ASSET_SORTS[sort_label]
+    signature = (tuple(sorted(filters.items())), sort_label, page_size)
+    page = current_page("assets", signature)
+    params = {**filters, "sort": sort, "order": order, "limit": page_size, "offset": page * page_size}
+
+    data = api_get(f"/assets/read?{urlencode(params)}")
+    assets = data.get("assets", []) if data else []
+    total = data.get("total", 0) if data else 0
 
     st.markdown(f"""
     <div style="font-family:'Space Mono',monospace; font-size:10px; color:#5A4A7A; 
-                letter-spacing:2px; margin-bottom:16px;">{len(assets)} ASSETS</div>
+                letter-spacing:2px; margin-bottom:16px;">{total} ASSETS</div>
     """, unsafe_allow_html=True)
 
-    for asset in assets:
-        status = asset.get("status", "Active")
-        size_kb = round(asset.get("file_size", 0) / 1024, 2)
-        with st.expander(f"#{asset['id']}  {asset.get('asset_name', '')}  ·  {asset.get('owner_email', '')}"):
-            col1, col2, col3 = st.columns([2, 1, 1])
-            with col1:
-                st.markdown(f"""
-                <div style="font-family:'Space Mono',monospace; font-size:9px; color:#5A4A7A; margin-bottom:4px;">SHA-256</div>
-                <div class="hash-display">{asset.get('hash','')}</div>
-                <div style="font-family:'Syne',sans-serif; font-size:13px; color:#5A4A7A; margin-top:8px;">
-                    {asset.get('description') or 'No description'}
-                </div>
-                """, unsafe_allow_html=True)
-            with col2:
-                st.markdown(f"""
-                <div style="display:grid; gap:10px;">
-                    <div>
-                        <div style="font-family:'Space Mono',monospace; font-size:9px; color:#3A2A5A; letter-spacing:2px;">STATUS</div>
-                        <span class="tag tag-{status.lower()}">{status}</span>
-                    </div>
-                    <div>
-                        <div style="font-family:'Space Mono',monospace; font-size:9px; color:#3A2A5A; letter-spacing:2px;">TYPE</div>
-                        <div style="font-family:'Space Mono',monospace; font-size:11px; color:#C0B4D0;">{asset.get('file_type','?')}</div>
-                    </div>
-                    <div>
-                        <div style="font-family:'Space Mono',monospace; font-size:9px; color:#3A2A5A; letter-spacing:2px;">SIZE</div>
-                        <div style="font-family:'Space Mono',monospace; font-size:11px; color:#C0B4D0;">{size_kb} KB</div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            with col3:
-                st.markdown("""
-                <div style="font-family:'Space Mono',monospace; font-size:9px; color:#5A4A7A; letter-spacing:2px; margin-bottom:8px;">
-                    UPDATE STATUS
-                </div>
-                """, unsafe_allow_html=True)
-                new_status = st.selectbox(
-                    "Status", ["Active", "Pending", "Suspended"],
-                    index=["Active","Pending","Suspended"].index(status),
-                    key=f"status_{asset['id']}", label_visibility="collapsed"
-                )
-                if st.button("UPDATE", key=f"upd_{asset['id']}"):
-                    r = requests.put(f"{API}/assets/status",
-                                     json={"asset_id": asset["id"], "status": new_status}, timeout=10)
-                    if r.status_code == 200:
-                        st.success("Status updated.")
-                        st.rerun()
-                    else:
-                        st.error("Update failed.")
-
-                st.markdown("<br>", unsafe_allow_html=True)
-                if st.button("⊗ DELETE", key=f"del_{asset['id']}"):
-                    r = requests.delete(f"{API}/assets/{asset['id']}",
-                                        params={"admin_uid": st.session_state.uid}, timeout=10)
-                    if r.status_code == 200:
-                        st.success("Asset deleted.")
-                        st.rerun()
-                    else:
-                        st.error("Delete failed.")
+    if not assets:
+        st.info("No assets match these filters.")
+        return
+
+    df = pd.DataFrame([{
+        "ID": a["id"],
+        "Name": a.get("asset_name", ""),
+        "Owner": a.get("owner_email") or "unknown",
+        "Status": a.get("status", "Active"),
+        "Type": a.get("file_type", "?"),
+        "Size (KB)": round((a.get("file_size") or 0) / 1024, 2),
+        "Registered": str(a.get("created_at", ""))[:19],
+    } for a in assets])
+    event = st.dataframe(
+        df, hide_index=True, use_container_width=True,
+        on_select="rerun", selection_mode="multi-row",
+        # A fresh widget per page and filter, so a selection never outlives the rows it indexed
+        key=f"assets_table_{hashlib.sha256(repr((signature, page)).encode()).hexdigest()[:16]}",
+    )
+    render_pager("assets", page, total, page_size)
+
+    if filters:
+        with st.expander(f"Bulk actions on all {total} matching assets"):
+            bulk_actions("bulk_filter", asset_filter=filters)
+
+    # Details and actions are only built for the selected row(s)
+    # The listing can still shrink under a kept selection (e.g. after a delete)
+    selected = [i for i in event.selection.rows if i < len(assets)]
+    if not selected:
+        st.caption("Select a row to view its hash and manage it, or several rows for bulk actions.")
+        return
+    if len(selected) > 1:
+        st.markdown("<div class='glow-divider'></div>", unsafe_allow_html=True)
+        bulk_actions("bulk_rows", asset_ids=[assets[i]["id"] for i in selected])
+        return
+    asset = assets[selected[0]]
+    status = asset.get("status", "Active")
+
+    st.markdown("<div class='glow-divider'></div>", unsafe_allow_html=True)
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown(f"""
+        <div style="font-family:'Syne',sans-serif; font-weight:700; font-size:15px; color:#E2D8F0;">
+            #{asset['id']}  {asset.get('asset_name', '')}
+        </div>
+        <div style="font-family:'Space Mono',monospace; font-size:9px; color:#5A4A7A; margin:8px 0 4px;">SHA-256</div>
+        <div class="hash-display">{asset.get('hash','')}</div>
+        <div style="font-family:'Syne',sans-serif; font-size:13px; color:#5A4A7A; margin-top:8px;">
+            {asset.get('description') or 'No description'}
+        </div>
+        """, unsafe_allow_html=True)
+    with col2:
+        st.markdown("""
+        <div style="font-family:'Space Mono',monospace; font-size:9px; color:#5A4A7A; letter-spacing:2px; margin-bottom:8px;">
+            UPDATE STATUS
+        </div>
+        """, unsafe_allow_html=True)
+        new_status = st.selectbox(
+            "Status", ["Active", "Pending", "Suspended"],
+            index=["Active","Pending","Suspended"].index(status),
+            key=f"status_{asset['id']}", label_visibility="collapsed"
+        )
+        if st.button("UPDATE", key=f"upd_{asset['id']}"):
+            code, _ = api_put("/assets/status", json={"asset_id": asset["id"], "status": new_status})
+            if code == 200:
+                st.success("Status updated.")
+                st.rerun()
+            else:
+                st.error("Update failed.")
+
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("⊗ DELETE", key=f"del_{asset['id']}"):
+            code, _ = api_delete(f"/assets/{asset['id']}", params={"admin_uid": st.session_state.uid})
+            if code == 200:
+                st.success("Asset deleted.")
+                st.rerun()
+            else:
+                st.error("Delete failed.")
 
 
 # ── All Users Page ─────────────────────────────────────────────────────────────
+USER_SORTS = {
+    "Newest": ("created_at", "desc"),
+    "Oldest": ("created_at", "asc"),
+    "Email": ("email", "asc"),
+    "Role": ("role", "asc"),
+}
+
+
 def page_all_users():
     st.markdown("""
     <div class="page-header">
@@ -535,38 +789,36 @@ def page_all_users():
     </div>
     """, unsafe_allow_html=True)
 
-    data = api_get("/users")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        sort_label = st.selectbox("Sort", list(USER_SORTS), label_visibility="collapsed")
+    with col2:
+        page_size = st.selectbox("Rows", PAGE_SIZES, label_visibility="collapsed", key="users_rows")
+
+    sort, order = USER_SORTS[sort_label]
+    page = current_page("users", (sort_label, page_size))
+    params = {"sort": sort, "order": order, "limit": page_size, "offset": page * page_size}
+    data = api_get(f"/users?{urlencode(params)}")
     users = data.get("users", []) if data else []
+    total = data.get("total", 0) if data else 0
 
     st.markdown(f"""
     <div style="font-family:'Space Mono',monospace; font-size:10px; color:#5A4A7A; 
-                letter-spacing:2px; margin-bottom:16px;">{len(users)} USERS REGISTERED</div>
+                letter-spacing:2px; margin-bottom:16px;">{total} USERS REGISTERED</div>
     """, unsafe_allow_html=True)
 
-    for user in users:
-        role = user.get("role", "client")
-        st.markdown(f"""
-        <div class="admin-card">
-            <div style="display:flex; align-items:flex-start; justify-content:space-between;">
-                <div>
-                    <div style="font-family:'Syne',sans-serif; font-weight:700; font-size:15px; 
-                                color:#E2D8F0;">{user.get('username') or user.get('email','').split('@')[0]}</div>
-                    <div style="font-family:'Space Mono',monospace; font-size:11px; color:#5A4A7A; margin-top:3px;">
-                        {user.get('email','')}
-                    </div>
-                    <div style="font-family:'Space Mono',monospace; font-size:9px; color:#3A2A5A; margin-top:4px;">
-                        UID: {user.get('uid','')[:24]}...
-                    </div>
-                </div>
-                <div style="text-align:right;">
-                    <span class="tag tag-{role}">{role.upper()}</span>
-                    <div style="font-family:'Space Mono',monospace; font-size:9px; color:#3A2A5A; margin-top:8px;">
-                        {str(user.get('created_at',''))[:10]}
-                    </div>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+    if not users:
+        return
+
+    df = pd.DataFrame([{
+        "Username": u.get("username") or u.get("email", "").split("@")[0],
+        "Email": u.get("email", ""),
+        "Role": (u.get("role") or "client").upper(),
+        "UID": u.get("uid", ""),
+        "Joined": str(u.get("created_at", ""))[:10],
+    } for u in users])
+    st.dataframe(df, hide_index=True, use_container_width=True)
+    render_pager("users", page, total, page_size)
 
 
 # ── Transfers Page ─────────────────────────────────────────────────────────────
@@ -659,7 +911,9 @@ def main():
         show_auth_page()
         return
 
+    st.session_state.api_degraded = None
     show_sidebar()
+    banner = st.empty()
 
     page = st.session_state.page
     if page == "overview":
@@ -673,6 +927,8 @@ def main():
     elif page == "activity":
         page_activity()
 
+    show_degraded_banner(banner)
+
 
 if __name__ == "__main__":
     main()
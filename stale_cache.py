@@ -0,0 +1,114 @@
+"""
+stale_cache.py — Serve-stale-on-error for AssetBlock GET endpoints.
+Every successful JSON GET response is remembered (last good copy per path and
+query, bounded by total bytes). When the same request later fails with 503
+because the database is unavailable, the remembered copy is sent instead,
+marked with `X-AssetBlock-Stale: true`, an Age header and a 110 Warning, so
+dashboards keep rendering while Postgres recovers.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+STALE_CACHE_MB = float(os.getenv("ASSETBLOCK_STALE_CACHE_MB", "64"))
+MAX_ENTRY_BYTES = 2 * 1024 * 1024
+
+STALE_HITS = metrics.CACHE_LOOKUPS.labels("stale", "hit")
+STALE_MISSES = metrics.CACHE_LOOKUPS.labels("stale", "miss")
+
+
+class _LastGood:
+    """Thread-safe LRU of key -> (stored_at, headers, body), evicted by total body size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: str, headers: list, body: bytes):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[2])
+            self._items[key] = (time.time(), headers, body)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes and self._items:
+                _, (_, _, evicted) = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+
+
+# ── ASGI middleware ───────────────────────────────────────────────────────────
+class StaleCacheMiddleware:
+    """
+    Wraps GET requests only. 200 application/json responses up to
+    MAX_ENTRY_BYTES are copied as they stream out; 304s and other types are
+    ignored. A 503 is swapped for the last good copy when there is one,
+    otherwise it goes through unchanged (with its Retry-After).
+    """
+
+    def __init__(self, app, max_bytes: int = int(STALE_CACHE_MB * 1024 * 1024), exclude=("/metrics",)):
+        self.app = app
+        self.exclude = tuple(exclude)
+        self._cache = _LastGood(max_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"].startswith(self.exclude):
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{scope['path']}?{scope['query_string'].decode('latin-1')}"
+        mode, headers, chunks, size, stale = None, [], [], 0, None
+
+        async def watch(message):
+            nonlocal mode, headers, size, stale
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                if message["status"] == 503:
+                    stale = self._cache.get(key)
+                    if stale is not None:
+                        mode = "stale"
+                        return
+                    STALE_MISSES.inc()
+                content_type = dict(headers).get(b"content-type", b"")
+                mode = "store" if message["status"] == 200 and content_type.startswith(b"application/json") else None
+            elif message["type"] == "http.response.body":
+                if mode == "stale":
+                    if not message.get("more_body", False):
+                        await self._send_stale(send, *stale)
+                    return
+                if mode == "store":
+                    chunks.append(message.get("body", b""))
+                    size += len(chunks[-1])
+                    if size > MAX_ENTRY_BYTES:
+                        mode, chunks[:] = None, []
+                    elif not message.get("more_body", False):
+                        self._cache.put(key, headers, b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, watch)
+
+    async def _send_stale(self, send, stored_at: float, headers: list, body: bytes):
+        STALE_HITS.inc()
+        age = str(int(time.time() - stored_at)).encode()
+        headers = [(k, v) for k, v in headers if k not in (b"content-length", b"cache-control")]
+        headers += [
+            (b"content-length", str(len(body)).encode()),
+            (b"cache-control", b"no-store"),
+            (b"age", age),
+            (b"warning", b'110 - "Response is Stale"'),
+            (b"x-assetblock-stale", b"true"),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
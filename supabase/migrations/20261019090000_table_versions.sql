@@ -0,0 +1,31 @@
+-- AssetBlock Database Schema
+-- Per-table change counters used as cheap ETag version markers
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name  VARCHAR(64) PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS users_version ON users;
+CREATE TRIGGER users_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS assets_version ON assets;
+CREATE TRIGGER assets_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON assets
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS transfer_history_version ON transfer_history;
+CREATE TRIGGER transfer_history_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON transfer_history
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
+
+DROP TRIGGER IF EXISTS activity_log_version ON activity_log;
+CREATE TRIGGER activity_log_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON activity_log
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version();
@@ -0,0 +1,5 @@
+-- AssetBlock Database Schema
+-- Chunked Merkle fingerprint stored alongside the legacy SHA-256
+
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS merkle_root       VARCHAR(64);
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS merkle_chunk_size INTEGER;
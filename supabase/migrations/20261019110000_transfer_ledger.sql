@@ -0,0 +1,21 @@
+-- AssetBlock Database Schema
+-- Hash-chained transfer ledger (see ledger.py)
+
+-- Ledger entries must outlive the asset they describe: drop the cascading FK
+ALTER TABLE transfer_history DROP CONSTRAINT IF EXISTS transfer_history_asset_id_fkey;
+
+ALTER TABLE transfer_history ADD COLUMN IF NOT EXISTS prev_hash       VARCHAR(64);
+ALTER TABLE transfer_history ADD COLUMN IF NOT EXISTS asset_prev_hash VARCHAR(64);
+ALTER TABLE transfer_history ADD COLUMN IF NOT EXISTS entry_hash      VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS transfer_history_entry_hash ON transfer_history (entry_hash);
+CREATE INDEX IF NOT EXISTS transfer_history_asset_chain ON transfer_history (asset_id, id);
+CREATE INDEX IF NOT EXISTS transfer_history_unsealed ON transfer_history (id) WHERE entry_hash IS NULL;
+
+CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+    id                SERIAL PRIMARY KEY,
+    last_entry_id     INTEGER NOT NULL,
+    entry_hash        VARCHAR(64) NOT NULL,
+    entries_verified  BIGINT NOT NULL DEFAULT 0,
+    verified_at       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,20 @@
+-- AssetBlock Database Schema
+-- Merkle mountain range over registered asset hashes (see registry_tree.py)
+
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS mmr_leaf_index BIGINT UNIQUE;
+
+CREATE TABLE IF NOT EXISTS registry_nodes (
+    height  SMALLINT NOT NULL,
+    idx     BIGINT NOT NULL,
+    hash    VARCHAR(64) NOT NULL,
+    PRIMARY KEY (height, idx)
+);
+
+CREATE TABLE IF NOT EXISTS registry_state (
+    id          SMALLINT PRIMARY KEY CHECK (id = 1),
+    leaf_count  BIGINT NOT NULL DEFAULT 0,
+    root        VARCHAR(64),
+    updated_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO registry_state (id, leaf_count) VALUES (1, 0) ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,16 @@
+-- AssetBlock Database Schema
+-- Stored responses for Idempotency-Key retries (see idempotency.py)
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key               VARCHAR(64) PRIMARY KEY,  -- sha256 of method, path and client key
+    method            VARCHAR(8) NOT NULL,
+    path              TEXT NOT NULL,
+    fingerprint       VARCHAR(64) NOT NULL,
+    status_code       SMALLINT,                 -- NULL while the first request is running
+    response_headers  TEXT,
+    response_body     BYTEA,
+    created_at        TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at        TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idempotency_keys_expires_at ON idempotency_keys (expires_at);